@@ -0,0 +1,321 @@
+import ast
+import os
+
+import cv2
+import numpy as np
+
+
+# Clases del modelo YOLO entrenado (id -> letra)
+CLASS_NAMES = {
+    0: "A", 1: "B", 2: "C", 3: "D", 4: "E", 5: "F", 6: "G", 7: "H", 8: "I", 9: "J",
+    10: "K", 11: "L", 12: "M", 13: "N", 14: "O", 15: "P", 16: "Q", 17: "R", 18: "S",
+    19: "T", 20: "U", 21: "V", 22: "W", 23: "X", 24: "Y", 25: "Z"
+}
+
+
+class InferenceBackend:
+    """Interfaz común de los motores de inferencia YOLO.
+
+    predict(frames) recibe una lista de frames BGR y devuelve, por frame, un
+    arreglo Nx6 float32 con columnas (x1, y1, x2, y2, confianza, clase) en
+    coordenadas del frame original.
+
+    imgsz=None usa el tamaño con el que se entrenó/exportó el modelo. Si
+    dynamic_imgsz es True, imgsz se puede cambiar entre llamadas.
+    """
+
+    name = None
+    default_imgsz = 640
+
+    def __init__(self, model_path, conf=0.6, iou=0.45, imgsz=None):
+        self.model_path = model_path
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = imgsz
+        self.dynamic_imgsz = False
+
+    def predict(self, frames):
+        raise NotImplementedError
+
+
+class UltralyticsBackend(InferenceBackend):
+    """Pesos .pt a través de ultralytics/PyTorch (importa torch)"""
+
+    name = 'ultralytics'
+
+    def __init__(self, model_path, num_threads=None, **options):
+        super().__init__(model_path, **options)
+        from ultralytics import YOLO
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = YOLO(model_path)
+        self.dynamic_imgsz = True
+        if self.imgsz is None:
+            self.imgsz = self.training_imgsz() or self.default_imgsz
+
+    def training_imgsz(self):
+        """imgsz de los argumentos de entrenamiento guardados en el checkpoint"""
+        train_args = (getattr(self.model, 'ckpt', None) or {}).get('train_args') or {}
+        imgsz = train_args.get('imgsz') or self.model.overrides.get('imgsz')
+        return _parse_imgsz(imgsz, None)
+
+    def predict(self, frames):
+        results = self.model.predict(
+            source=list(frames),
+            conf=self.conf,
+            iou=self.iou,
+            show=False,
+            verbose=False,
+            imgsz=self.imgsz
+        )
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                detections.append(np.zeros((0, 6), dtype=np.float32))
+                continue
+            detections.append(np.concatenate([
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy()[:, None],
+                boxes.cls.cpu().numpy()[:, None],
+            ], axis=1).astype(np.float32))
+        return detections
+
+
+class ExportedGraphBackend(InferenceBackend):
+    """Pre/post-procesado propio (letterbox + NMS) para grafos YOLOv8 exportados"""
+
+    # Máximo desplazamiento por clase para hacer NMS por clase en una sola pasada
+    max_wh = 7680
+
+    def __init__(self, model_path, **options):
+        super().__init__(model_path, **options)
+        # Solo los grafos con lote dinámico reciben varios frames a la vez
+        self.batched = False
+
+    def letterbox(self, frame):
+        """Redimensionar manteniendo proporción y rellenar a imgsz x imgsz"""
+        h, w = frame.shape[:2]
+        ratio = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+        pad_w, pad_h = (self.imgsz - new_w) / 2, (self.imgsz - new_h) / 2
+        left, top = int(round(pad_w - 0.1)), int(round(pad_h - 0.1))
+
+        if (new_w, new_h) != (w, h):
+            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        canvas[top:top + new_h, left:left + new_w] = frame
+        return canvas, ratio, (left, top)
+
+    def preprocess(self, frames):
+        """Lote NCHW float32 RGB normalizado y los parámetros para deshacer el letterbox"""
+        batch = np.empty((len(frames), 3, self.imgsz, self.imgsz), dtype=np.float32)
+        transforms = []
+        for index, frame in enumerate(frames):
+            canvas, ratio, offset = self.letterbox(frame)
+            # BGR -> RGB y HWC -> CHW en una sola copia
+            np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=batch[index])
+            transforms.append((ratio, offset, frame.shape[:2]))
+        return batch, transforms
+
+    def postprocess(self, output, transform):
+        """Salida YOLOv8 (4 + nc, N) -> detecciones Nx6 tras umbral y NMS"""
+        ratio, (left, top), (height, width) = transform
+        predictions = output.T
+        scores = predictions[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+
+        keep = confidences >= self.conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        predictions, class_ids, confidences = predictions[keep], class_ids[keep], confidences[keep]
+
+        # xywh (centro) -> xyxy
+        xy, wh = predictions[:, :2], predictions[:, 2:4]
+        boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1)
+
+        offsets = class_ids[:, None].astype(np.float32) * self.max_wh
+        nms_boxes = boxes + offsets
+        nms_xywh = np.concatenate([nms_boxes[:, :2], nms_boxes[:, 2:] - nms_boxes[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(nms_xywh.tolist(), confidences.tolist(), self.conf, self.iou)
+        indices = np.array(indices, dtype=np.int64).reshape(-1)
+
+        boxes = boxes[indices]
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - left) / ratio).clip(0, width)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - top) / ratio).clip(0, height)
+        return np.concatenate([
+            boxes,
+            confidences[indices, None],
+            class_ids[indices, None].astype(np.float32),
+        ], axis=1).astype(np.float32)
+
+    def predict(self, frames):
+        batch, transforms = self.preprocess(frames)
+        if self.batched:
+            outputs = self._infer(batch)
+        else:
+            outputs = np.concatenate([self._infer(batch[i:i + 1]) for i in range(len(frames))])
+        return [self.postprocess(output, transform) for output, transform in zip(outputs, transforms)]
+
+    def _infer(self, batch):
+        raise NotImplementedError
+
+
+def _parse_imgsz(value, default):
+    """Leer imgsz de los metadatos de ultralytics ('[416, 416]', '416' o lista)"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return default
+    if isinstance(value, (list, tuple)):
+        value = value[0]
+    return int(value)
+
+
+class AdaptiveInputSize:
+    """Baja imgsz cuando el tiempo por frame supera el presupuesto y lo sube con holgura.
+
+    El costo de YOLO crece aproximadamente con imgsz², así que solo se sube de
+    tamaño si el tiempo estimado al nuevo tamaño sigue dentro del presupuesto.
+    """
+
+    def __init__(self, choices, budget_ms, initial, alpha=0.2, warmup=5, headroom=0.9):
+        self.choices = sorted(choices)
+        self.budget_ms = budget_ms
+        self.alpha = alpha
+        self.warmup = warmup
+        self.headroom = headroom
+        self.index = min(range(len(self.choices)), key=lambda i: abs(self.choices[i] - initial))
+        self.average_ms = None
+        self.samples = 0
+
+    @property
+    def imgsz(self):
+        return self.choices[self.index]
+
+    def update(self, frame_ms):
+        """Registrar el tiempo de un frame y devolver el imgsz a usar a continuación"""
+        if self.average_ms is None:
+            self.average_ms = frame_ms
+        else:
+            self.average_ms += self.alpha * (frame_ms - self.average_ms)
+        self.samples += 1
+        if self.samples < self.warmup:
+            return self.imgsz
+
+        current = self.imgsz
+        if self.average_ms > self.budget_ms and self.index > 0:
+            self.index -= 1
+        elif self.index < len(self.choices) - 1:
+            scale = (self.choices[self.index + 1] / current) ** 2
+            if self.average_ms * scale < self.budget_ms * self.headroom:
+                self.index += 1
+
+        if self.imgsz != current:
+            # Empezar a medir de nuevo con el tamaño nuevo
+            self.average_ms = None
+            self.samples = 0
+        return self.imgsz
+
+
+class OnnxRuntimeBackend(ExportedGraphBackend):
+    """Grafo ONNX ejecutado con ONNX Runtime en CPU"""
+
+    name = 'onnxruntime'
+
+    def __init__(self, model_path, num_threads=None, **options):
+        super().__init__(model_path, **options)
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=session_options, providers=['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batched = not isinstance(model_input.shape[0], int)
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if isinstance(model_input.shape[2], int):
+            self.imgsz = model_input.shape[2]
+        else:
+            self.dynamic_imgsz = True
+            self.imgsz = self.imgsz or _parse_imgsz(metadata.get('imgsz'), self.default_imgsz)
+
+    def _infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOBackend(ExportedGraphBackend):
+    """Modelo OpenVINO IR (.xml/.bin, FP32/FP16/INT8) en CPU"""
+
+    name = 'openvino'
+
+    def __init__(self, model_path, num_threads=None, **options):
+        super().__init__(model_path, **options)
+        import openvino as ov
+
+        core = ov.Core()
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if num_threads:
+            config['INFERENCE_NUM_THREADS'] = num_threads
+        model = core.read_model(model_path)
+        self.compiled = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled.output(0)
+
+        shape = self.compiled.input(0).partial_shape
+        self.batched = shape[0].is_dynamic
+        if shape[2].is_static:
+            self.imgsz = shape[2].get_length()
+        else:
+            self.dynamic_imgsz = True
+            self.imgsz = self.imgsz or _parse_imgsz(self._read_metadata().get('imgsz'), self.default_imgsz)
+
+    def _read_metadata(self):
+        """metadata.yaml que ultralytics deja junto al .xml"""
+        path = os.path.join(os.path.dirname(self.model_path), 'metadata.yaml')
+        if not os.path.exists(path):
+            return {}
+        try:
+            import yaml
+        except ImportError:
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+
+    def _infer(self, batch):
+        return self.compiled(batch)[self.output]
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+}
+
+
+def default_model_path(backend, weights_path):
+    """Ruta por defecto del modelo exportado por ultralytics junto a los pesos .pt"""
+    root, _ = os.path.splitext(weights_path)
+    if backend == OnnxRuntimeBackend.name:
+        return root + '.onnx'
+    if backend == OpenVINOBackend.name:
+        return os.path.join(root + '_openvino_model', os.path.basename(root) + '.xml')
+    return weights_path
+
+
+def load_backend(name, model_path, **options):
+    """Crear el motor de inferencia configurado"""
+    if name not in BACKENDS:
+        raise ValueError(f"Motor de inferencia desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"No se encontró el modelo en: {model_path}")
+    return BACKENDS[name](model_path, **options)
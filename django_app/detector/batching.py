@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Agrupa frames pendientes de todas las sesiones en una sola llamada al modelo.
+
+    Cada frame enviado recibe un Future. Un hilo propio espera hasta window_ms
+    desde el primer frame pendiente (o hasta reunir max_batch frames), ejecuta
+    predict sobre el lote y entrega a cada Future su resultado.
+    """
+
+    def __init__(self, predict, window_ms=8, max_batch=8):
+        self._predict = predict
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Métricas
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.last_batch_size = 0
+        self.errors = 0
+
+    def submit(self, frame):
+        """Encolar un frame y obtener el Future con su resultado"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((frame, future))
+        return future
+
+    def submit_many(self, frames):
+        return [self.submit(frame) for frame in frames]
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='detector-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Reunir un lote: bloquea por el primer frame y luego espera como máximo la ventana"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Descartar frames cuyo Future fue cancelado mientras esperaba
+            batch = [(frame, future) for frame, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self._predict([frame for frame, _ in batch])
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+                self.last_batch_size = len(batch)
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        """Profundidad de cola y grado de llenado de los lotes"""
+        with self._stats_lock:
+            batches, frames = self.batches, self.frames
+            return {
+                'queue_depth': self._queue.qsize(),
+                'window_ms': round(self.window * 1000, 2),
+                'max_batch': self.max_batch,
+                'batches': batches,
+                'frames': frames,
+                'errors': self.errors,
+                'last_batch_size': self.last_batch_size,
+                'avg_batch_size': round(frames / batches, 2) if batches else 0,
+                'fill_ratio': round(frames / (batches * self.max_batch), 3) if batches else 0,
+            }
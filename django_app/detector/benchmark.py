@@ -0,0 +1,214 @@
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .evaluation import IMAGE_EXTENSIONS
+
+
+def load_frames(source, size=(640, 480), max_frames=200):
+    """Frames BGR del tamaño de la cámara desde un video, una carpeta de imágenes o un dataset.
+
+    source puede ser un archivo de video, una carpeta con imágenes, una carpeta
+    dataset* (se usan sus imágenes de test/) o 'synthetic' (ruido aleatorio
+    reproducible). Se cargan en memoria para que leer la cámara no cueste nada.
+    """
+    frames = []
+    if source == 'synthetic':
+        generator = np.random.default_rng(0)
+        frames = [generator.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8) for _ in range(30)]
+    elif os.path.isfile(source):
+        cap = cv2.VideoCapture(source)
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    elif os.path.isdir(source):
+        images_dir = os.path.join(source, 'test', 'images')
+        if not os.path.isdir(images_dir):
+            images_dir = source
+        paths = sorted(
+            path for path in glob.glob(os.path.join(images_dir, '*'))
+            if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+        )
+        frames = [frame for frame in (cv2.imread(path) for path in paths[:max_frames]) if frame is not None]
+
+    if not frames:
+        raise ValueError(f"No se pudieron leer frames de: {source}")
+    return [cv2.resize(frame, size) if frame.shape[1::-1] != tuple(size) else frame for frame in frames]
+
+
+class FakeCamera:
+    """Sustituto de cv2.VideoCapture que entrega frames en bucle a un ritmo fijo.
+
+    Guarda cuándo se leyó cada frame (numerados desde 1) para medir la latencia
+    de punta a punta hasta que el detector lo publica.
+    """
+
+    def __init__(self, frames, fps=30, history=1000):
+        self.frames = frames
+        self.fps = fps
+        self.reads = 0
+        self.read_times = OrderedDict()
+        self.history = history
+        self._opened = True
+        self._next_read = None
+        self._lock = threading.Lock()
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        # Ritmo de la cámara: cada read() espera a su turno como un dispositivo real
+        if self.fps:
+            now = time.perf_counter()
+            if self._next_read is not None and now < self._next_read:
+                time.sleep(self._next_read - now)
+            self._next_read = max(now, self._next_read or now) + 1.0 / self.fps
+        with self._lock:
+            frame = self.frames[self.reads % len(self.frames)]
+            self.reads += 1
+            self.read_times[self.reads] = time.perf_counter()
+            if len(self.read_times) > self.history:
+                self.read_times.popitem(last=False)
+        return True, frame.copy()
+
+    def read_time(self, read_number):
+        with self._lock:
+            return self.read_times.get(read_number)
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps or 0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.frames[0].shape[1]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.frames[0].shape[0]
+        return 0
+
+    def release(self):
+        self._opened = False
+
+
+def current_rss():
+    """Memoria residente del proceso en bytes (None si no se puede medir en esta plataforma)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ResourceMonitor:
+    """Tiempo de CPU del proceso y pico de memoria residente mientras dura el bloque with"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss = None
+        self._running = False
+        self._thread = None
+
+    def __enter__(self):
+        self.peak_rss = current_rss()
+        self._running = True
+        self._thread = threading.Thread(target=self._sample, name='benchmark-rss', daemon=True)
+        self._thread.start()
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cpu_s = time.process_time() - self._cpu_started
+        self.wall_s = time.perf_counter() - self._wall_started
+        self._running = False
+        self._thread.join()
+        return False
+
+    def _sample(self):
+        while self._running:
+            rss = current_rss()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+            time.sleep(self.interval)
+
+    def as_dict(self):
+        return {
+            'wall_s': round(self.wall_s, 3),
+            'cpu_s': round(self.cpu_s, 3),
+            # Puede pasar de 100 %: cuenta todos los hilos del proceso
+            'cpu_percent': round(self.cpu_s / self.wall_s * 100, 1) if self.wall_s else 0.0,
+            'peak_rss_mb': round(self.peak_rss / 2 ** 20, 1) if self.peak_rss else None,
+        }
+
+
+def scenario_result(latency, count, monitor, **extra):
+    """Resultado de un escenario: rendimiento, percentiles de latencia y recursos"""
+    result = {
+        'count': count,
+        'throughput': round(count / monitor.wall_s, 2) if monitor.wall_s else 0.0,
+        'latency': {key: value for key, value in latency.as_dict().items() if key != 'buckets'},
+    }
+    result.update(monitor.as_dict())
+    result.update(extra)
+    return result
+
+
+# Métricas comparadas contra la línea base: (ruta, True si más alto es mejor)
+COMPARED_METRICS = (
+    (('throughput',), True),
+    (('latency', 'p50_ms'), False),
+    (('latency', 'p95_ms'), False),
+    (('latency', 'p99_ms'), False),
+    (('cpu_percent',), False),
+    (('peak_rss_mb',), False),
+)
+
+
+def compare_reports(current, baseline, tolerance=0.10):
+    """Comparar dos reportes del benchmark por configuración y escenario.
+
+    Devuelve (filas, regresiones): cada fila es (configuración, escenario, métrica,
+    base, actual, cambio relativo) y las regresiones son las filas que empeoran
+    más que tolerance.
+    """
+    rows, regressions = [], []
+    for config_name, scenarios in current['configurations'].items():
+        baseline_scenarios = baseline.get('configurations', {}).get(config_name)
+        if baseline_scenarios is None:
+            continue
+        for scenario, result in scenarios.items():
+            baseline_result = baseline_scenarios.get(scenario)
+            if baseline_result is None:
+                continue
+            for path, higher_is_better in COMPARED_METRICS:
+                before, after = baseline_result, result
+                for key in path:
+                    before = before.get(key) if isinstance(before, dict) else None
+                    after = after.get(key) if isinstance(after, dict) else None
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                row = (config_name, scenario, '.'.join(path), before, after, change)
+                rows.append(row)
+                if (-change if higher_is_better else change) > tolerance:
+                    regressions.append(row)
+    return rows, regressions
+
@@ -0,0 +1,90 @@
+import threading
+
+
+class Subscription:
+    """Buzón de un solo lugar: el frame nuevo reemplaza al que no se alcanzó a enviar"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._woken = False
+        self.level = None  # (calidad, escala) actual del espectador
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify()
+
+    def wake(self):
+        """Despertar al lector sin entregar nada (por ejemplo al detener la cámara)"""
+        with self._condition:
+            self._woken = True
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Tomar el frame pendiente (EncodedFrame) o None si se agotó la espera"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self._woken, timeout)
+            item, self._item, self._woken = self._item, None, False
+            if item is not None:
+                self.delivered += 1
+            return item
+
+
+class FrameBroadcaster:
+    """Reparte cada frame codificado una sola vez a todos los espectadores del MJPEG.
+
+    Publicar nunca bloquea: un cliente lento solo pierde frames intermedios y no
+    frena al bucle de inferencia ni a los demás espectadores.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self.published = 0
+        # Contadores de suscripciones ya cerradas
+        self._closed_delivered = 0
+        self._closed_dropped = 0
+
+    def subscribe(self):
+        subscription = Subscription()
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.discard(subscription)
+                self._closed_delivered += subscription.delivered
+                self._closed_dropped += subscription.dropped
+
+    def publish(self, packet):
+        with self._lock:
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(packet)
+
+    def wake_all(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.wake()
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            delivered = self._closed_delivered + sum(s.delivered for s in subscribers)
+            dropped = self._closed_dropped + sum(s.dropped for s in subscribers)
+            return {
+                'viewers': len(subscribers),
+                'published': self.published,
+                'delivered': delivered,
+                'dropped': dropped,
+                'viewer_levels': [subscription.level for subscription in subscribers],
+            }
@@ -1,395 +1,1234 @@
 import cv2
-import mediapipe as mp
-from ultralytics import YOLO
-from collections import deque, Counter
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+import functools
 import numpy as np
+import queue
+import random
 import threading
-import base64
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 import os
 import time
+from .backends import CLASS_NAMES, AdaptiveInputSize, default_model_path, load_backend
+from .batching import MicroBatcher
+from .broadcast import FrameBroadcaster
+from .encoding import AdaptiveQuality, EncodedFrame, load_encoder
+from .landmarks import KNNLandmarkClassifier, normalized_landmarks
+from .metrics import MetricsRegistry
+from .motion import MotionGate
+from .overlay import OverlayRenderer
+from .pipeline import Pipeline
+from .smoothing import TemporalSmoother
+from .tracking import HandValidationCache, RoiTracker
+
+
+def decode_image(data):
+    """Decodificar bytes JPEG/WebP/PNG a un frame BGR (None si no es una imagen válida)"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class FrameGrabber:
+    """Hilo de captura que mantiene siempre el frame más reciente de la cámara"""
+
+    def __init__(self, cap, metrics=None):
+        self.cap = cap
+        self.metrics = metrics
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Iniciar el hilo de captura"""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='detector-capture', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detener el hilo de captura y esperar a que termine"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        """Leer frames continuamente sobrescribiendo el único slot disponible"""
+        while self._running:
+            started = time.perf_counter()
+            ret, frame = self.cap.read()
+            if self.metrics is not None:
+                self.metrics.observe('capture', time.perf_counter() - started)
+            if not ret or frame is None:
+                time.sleep(0.01)
+                continue
+            with self._condition:
+                self._frame = frame
+                self._frame_id += 1
+                self._condition.notify_all()
+
+    def get_latest(self, after_id=0, timeout=None):
+        """Obtener (frame_id, frame) más reciente con id mayor que after_id.
+
+        Si timeout es None no espera; retorna (after_id, None) si no hay frame nuevo.
+        """
+        with self._condition:
+            if timeout is not None and self._frame_id <= after_id:
+                self._condition.wait_for(
+                    lambda: self._frame_id > after_id or not self._running, timeout
+                )
+            if self._frame_id <= after_id:
+                return after_id, None
+            return self._frame_id, self._frame
+
+
+class FrozenRecord:
+    """Registro inmutable con __slots__; se reemplaza completo, nunca se modifica"""
+    __slots__ = ()
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+    
+    def replace(self, **changes):
+        """Crear una copia con algunos campos cambiados"""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return type(self)(**fields)
+
+
+class DetectionSnapshot(FrozenRecord):
+    """Resultado publicado por el bucle de inferencia (intercambio atómico de referencia)"""
+    __slots__ = (
+        'frame_id', 'frame', 'image', 'letter', 'confidence', 'box', 'landmarks', 'engine',
+        'committed', 'training', 'training_result', 'timestamp',
+    )
+    
+    def as_data(self):
+        """Metadatos para las respuestas JSON (sin la imagen)"""
+        data = {
+            'frame_id': self.frame_id if self.frame is not None else None,
+            'letter': self.letter,
+            'confidence': self.confidence,
+            'box': self.box,
+            'landmarks': self.landmarks,
+            'frame_size': self.image.shape[1::-1] if self.image is not None else None,
+            'engine': self.engine,
+            'status': 'running'
+        }
+        # Último cambio de letra confirmada por el suavizado
+        if self.committed:
+            data['committed'] = self.committed
+        # Información de entrenamiento solo si existe
+        if self.training:
+            data['training'] = self.training
+        if self.training_result:
+            data['training_result'] = self.training_result
+        return data
+
+
+class TrainingState(FrozenRecord):
+    """Estado del modo entrenamiento"""
+    __slots__ = (
+        'active', 'target_letter', 'correct_detections', 'total_attempts',
+        'consecutive_correct', 'event_id', 'last_result',
+    )
+    
+    def accuracy(self):
+        if not self.total_attempts:
+            return 0
+        return round((self.correct_detections / self.total_attempts) * 100, 1)
+    
+    def as_status(self):
+        """Representación para las respuestas JSON"""
+        if not self.active:
+            return None
+        return {
+            'active': True,
+            'target_letter': self.target_letter,
+            'correct_detections': self.correct_detections,
+            'total_attempts': self.total_attempts,
+            'consecutive_correct': self.consecutive_correct,
+            'accuracy': self.accuracy()
+        }
+
+
+# Motores para decidir la letra: YOLO sobre la imagen o clasificador sobre landmarks de MediaPipe
+ENGINE_YOLO = 'yolo'
+ENGINE_LANDMARKS = 'landmarks'
+ENGINES = (ENGINE_YOLO, ENGINE_LANDMARKS)
+# Marca de los elementos del pipeline que reutilizan el último resultado publicado
+REUSE_RESULT = 'reuse'
+
+# Origen de los frames que consume una sesión: la cámara del servidor o /upload-frames/
+SOURCE_CAMERA = 'camera'
+SOURCE_UPLOAD = 'upload'
+
+
+EMPTY_SNAPSHOT = DetectionSnapshot(
+    frame_id=0, frame=None, image=None, letter="NINGUNA", confidence=0, box=None, landmarks=None,
+    training=None, training_result=None, timestamp=0.0,
+)
+
+INACTIVE_TRAINING = TrainingState(
+    active=False, target_letter=None, correct_detections=0, total_attempts=0,
+    consecutive_correct=0, event_id=0, last_result=None,
+)
+
+
+class DetectionSession:
+    """Estado ligero por cliente: suavizado, entrenamiento y último resultado"""
+    
+    def __init__(self, key, training_alphabet):
+        self.key = key
+        # Votación ponderada por confianza con tiempo mínimo antes de cambiar de letra
+        self.smoother = TemporalSmoother(
+            window=getattr(settings, 'DETECTOR_SMOOTHING_WINDOW', 7),
+            decay=getattr(settings, 'DETECTOR_SMOOTHING_DECAY', 1.0),
+            min_hold=getattr(settings, 'DETECTOR_SMOOTHING_MIN_HOLD', 0.0),
+        )
+        self.training = INACTIVE_TRAINING
+        self.result = EMPTY_SNAPSHOT
+        self.tracker = None  # RoiTracker para los frames subidos por esta sesión
+        self.validation_cache = None  # HandValidationCache para los frames subidos
+        self.engine = None  # ENGINE_YOLO / ENGINE_LANDMARKS; None = DETECTOR_ENGINE
+        # SOURCE_CAMERA / SOURCE_UPLOAD: solo las sesiones de la cámara reciben sus frames
+        self.source = None
+        self.last_seen = time.monotonic()
+        self.training_alphabet = training_alphabet
+        self._lock = threading.RLock()
+    
+    def observe(self, snapshot):
+        """Aplicar suavizado y entrenamiento de esta sesión a una detección cruda"""
+        with self._lock:
+            # Suavizado temporal (incremental, sin recontar la ventana)
+            detected_letter = self.smoother.update(snapshot.letter, snapshot.confidence, snapshot.timestamp)
+            
+            # Verificar entrenamiento si está activo
+            if self.training.active:
+                self.check_training_success(detected_letter, snapshot.confidence)
+            training = self.training
+            
+            self.result = snapshot.replace(
+                letter=detected_letter,
+                committed=self.smoother.last_event(),
+                training=training.as_status(),
+                training_result=training.last_result,
+            )
+            return self.result
+    
+    def refresh_frame(self, snapshot):
+        """Actualizar solo la imagen del resultado (frames en que se saltó la inferencia)"""
+        with self._lock:
+            self.result = self.result.replace(
+                frame_id=snapshot.frame_id, frame=snapshot.frame, image=snapshot.image,
+            )
+    
+    def events_since(self, event_id):
+        """Letras confirmadas después de event_id, para clientes que se saltaron resultados"""
+        with self._lock:
+            return self.smoother.events_since(event_id)
+    
+    def can_skip_inference(self, now):
+        """True si la letra confirmada no puede cambiar todavía y no hay entrenamiento activo"""
+        return not self.training.active and not self.smoother.can_change(now)
+    
+    @property
+    def training_mode(self):
+        return self.training.active
+    
+    def start_training_mode(self):
+        """Iniciar modo entrenamiento"""
+        with self._lock:
+            self.training = INACTIVE_TRAINING.replace(
+                active=True,
+                target_letter=random.choice(self.training_alphabet),
+                event_id=self.training.event_id,
+            )
+        print(f"Modo entrenamiento iniciado. Letra objetivo: {self.training.target_letter}")
+        return self.training.target_letter
+        
+    def stop_training_mode(self):
+        """Detener modo entrenamiento"""
+        with self._lock:
+            self.training = INACTIVE_TRAINING.replace(event_id=self.training.event_id)
+        
+    def get_next_training_letter(self):
+        """Obtener siguiente letra para entrenar"""
+        with self._lock:
+            self.training = self.training.replace(target_letter=random.choice(self.training_alphabet))
+            return self.training.target_letter
+        
+    def check_training_success(self, detected_letter, confidence):
+        """Verificar si la detección es correcta en modo entrenamiento"""
+        with self._lock:
+            state = self.training
+            if not state.active or not state.target_letter:
+                return None
+                
+            total = state.total_attempts + 1
+            result = None
+            
+            if detected_letter == state.target_letter and confidence >= 70:
+                correct = state.correct_detections + 1
+                consecutive = state.consecutive_correct + 1
+                
+                # Obtener nueva letra después de éxito
+                next_letter = random.choice(self.training_alphabet)
+                state = state.replace(
+                    target_letter=next_letter, correct_detections=correct,
+                    total_attempts=total, consecutive_correct=consecutive,
+                )
+                result = {
+                    'success': True,
+                    'message': f'¡FELICITACIONES! 🎉 Hiciste correctamente la "{detected_letter}"',
+                    'next_letter': next_letter,
+                    'stats': {
+                        'correct': correct,
+                        'total': total,
+                        'consecutive': consecutive,
+                        'accuracy': state.accuracy()
+                    }
+                }
+            else:
+                state = state.replace(total_attempts=total, consecutive_correct=0)
+                if detected_letter != state.target_letter and detected_letter != "NINGUNA":
+                    result = {
+                        'success': False,
+                        'message': f'Casi! Detecté "{detected_letter}" pero necesito "{state.target_letter}"',
+                        'target_letter': state.target_letter
+                    }
+            
+            if result:
+                # Identificador para que los clientes no repitan el mismo evento
+                event_id = state.event_id + 1
+                result['event_id'] = event_id
+                state = state.replace(event_id=event_id, last_result=result)
+            
+            self.training = state
+            return result
+        
+    def get_training_status(self):
+        """Obtener estado del entrenamiento"""
+        return self.training.as_status()
+
+
+class SessionPool:
+    """Sesiones indexadas por clave con expulsión LRU de las inactivas"""
+    
+    def __init__(self, training_alphabet, max_sessions=50, idle_timeout=300):
+        self.training_alphabet = training_alphabet
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, source=None):
+        """Obtener (o crear) la sesión y marcarla como usada recientemente.
+
+        source registra de dónde toma sus resultados (SOURCE_CAMERA o SOURCE_UPLOAD).
+        """
+        with self._lock:
+            session = self._sessions.pop(key, None)
+            if session is None:
+                session = DetectionSession(key, self.training_alphabet)
+            session.last_seen = time.monotonic()
+            if source is not None:
+                session.source = source
+            self._sessions[key] = session
+            self._evict()
+            return session
+    
+    def active(self, source=None):
+        """Lista de sesiones vivas (solo las de ese origen si se indica), de la menos a la más reciente"""
+        with self._lock:
+            self._evict()
+            return [
+                session for session in self._sessions.values()
+                if source is None or session.source == source
+            ]
+    
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_seen < self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._sessions)
+
+
+class HandsPool:
+    """Conjunto acotado de instancias de MediaPipe Hands (cada una de uso exclusivo)"""
+    
+    def __init__(self, factory, size):
+        self._factory = factory
+        self._size = size
+        self._created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def acquire(self):
+        hands = self._checkout()
+        try:
+            yield hands
+        finally:
+            self._idle.put(hands)
+    
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                return self._factory()
+        return self._idle.get()
+
 
 class SignLanguageDetector:
     def __init__(self):
-        # Cargar YOLO model - ruta fija
-        model_path = os.path.join(settings.BASE_DIR.parent, 'runs/detect/train3/weights/best.pt')
-
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"No se encontró el modelo en: {model_path}")
+        # Cargar YOLO con el motor configurado (ultralytics, onnxruntime u openvino)
+        backend_name = getattr(settings, 'DETECTOR_BACKEND', 'ultralytics')
+        model_path = getattr(settings, 'DETECTOR_BACKEND_MODEL_PATH', None) or default_model_path(
+            backend_name, settings.MODEL_PATH
+        )
             
-        print(f"Cargando modelo desde: {model_path}")
-        self.model = YOLO(model_path)
+        print(f"Cargando modelo ({backend_name}) desde: {model_path}")
+        self.backend = load_backend(
+            backend_name, model_path,
+            conf=0.6,  # Aumentado para mejor precisión
+            imgsz=getattr(settings, 'DETECTOR_IMGSZ', None),  # None = tamaño de entrenamiento
+            num_threads=getattr(settings, 'DETECTOR_NUM_THREADS', None),
+        )
+        print(f"Tamaño de entrada YOLO: {self.backend.imgsz}")
         
-        # Inicializar MediaPipe con configuración optimizada
+        # Inicializar MediaPipe con configuración optimizada (se importa aquí: es pesado
+        # y no hace falta para migrate, collectstatic ni los demás comandos)
+        import mediapipe as mp
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            min_detection_confidence=0.7,  # Aumentado para mejor precisión
-            min_tracking_confidence=0.5
+        self.hands_pool = HandsPool(
+            self._create_hands, getattr(settings, 'DETECTOR_HANDS_POOL_SIZE', 2)
+        )
+        # Clasificador de letras por landmarks (motor alternativo; YOLO queda de respaldo)
+        self.default_engine = getattr(settings, 'DETECTOR_ENGINE', ENGINE_YOLO)
+        self.landmark_classifier = None
+        self.landmark_min_confidence = getattr(settings, 'DETECTOR_LANDMARK_MIN_CONFIDENCE', 0.6)
+        landmark_model_path = getattr(settings, 'DETECTOR_LANDMARK_MODEL_PATH', None)
+        if landmark_model_path and os.path.exists(landmark_model_path):
+            self.landmark_classifier = KNNLandmarkClassifier.load(landmark_model_path)
+            print(f"Clasificador de landmarks cargado: {len(self.landmark_classifier.labels)} muestras")
+        elif self.default_engine == ENGINE_LANDMARKS:
+            print("⚠️ No hay clasificador de landmarks (python manage.py train_landmark_classifier); se usa YOLO")
+        
+        # Dibujo del overlay: en el navegador (canvas) o en el frame del servidor
+        self.client_overlay = getattr(settings, 'DETECTOR_CLIENT_OVERLAY', True)
+        self.overlay = OverlayRenderer(self.mp_hands.HAND_CONNECTIONS)
+        
+        # El modelo YOLO se comparte entre sesiones y no es reentrante
+        self._model_lock = threading.Lock()
+        
+        # Lotes de frames de todas las sesiones/streams para un solo predict
+        self.batcher = MicroBatcher(
+            self._predict,
+            window_ms=getattr(settings, 'DETECTOR_BATCH_WINDOW_MS', 8),
+            max_batch=getattr(settings, 'DETECTOR_MAX_BATCH', 8),
         )
-        self.mp_drawing = mp.solutions.drawing_utils
         
         # Diccionario de clases YOLO
-        self.class_names = {
-            0: "A", 1: "B", 2: "C", 3: "D", 4: "E", 5: "F", 6: "G", 7: "H", 8: "I", 9: "J",
-            10: "K", 11: "L", 12: "M", 13: "N", 14: "O", 15: "P", 16: "Q", 17: "R", 18: "S",
-            19: "T", 20: "U", 21: "V", 22: "W", 23: "X", 24: "Y", 25: "Z"
-        }
+        self.class_names = dict(CLASS_NAMES)
         
-        # Historial para suavizado (aumentado para mejor estabilidad)
-        self.history = deque(maxlen=7)
+        # Duración por etapa y contadores de eventos (/metrics)
+        self.metrics = MetricsRegistry(window=getattr(settings, 'DETECTOR_METRICS_WINDOW', 500))
         
         # Estado de la detección
-        self.current_letter = "NINGUNA"
-        self.current_confidence = 0.0
+        self._lifecycle_lock = threading.RLock()
         self.is_running = False
         self.cap = None
+        self.grabber = None
         
-        # Variables de optimización de rendimiento
-        self.frame_skip_counter = 0
-        self.frame_skip_rate = 2  # Procesar cada 2 frames
-        self.last_frame = None
-        self.last_detection_time = 0
-        self.detection_interval = 0.05  # 50ms mínimo entre detecciones
+        # Bucle de inferencia en segundo plano
+        self.inference_fps = getattr(settings, 'DETECTOR_INFERENCE_FPS', 15)
+        self.capture_size = getattr(settings, 'DETECTOR_CAPTURE_SIZE', (1280, 720))
         
-        # Cache para frames procesados
-        self.frame_cache = {}
-        self.cache_max_size = 10
+        # Región de interés alrededor de la última mano (cámara local)
+        self.roi_tracking = getattr(settings, 'DETECTOR_ROI_TRACKING', True)
+        self.tracker = self._create_tracker()
+        # Reutilizar la validación de MediaPipe mientras la mano no se mueva
+        self.validation_cache = self._create_validation_cache()
         
-        # Modo entrenamiento
-        self.training_mode = False
-        self.target_letter = None
-        self.correct_detections = 0
-        self.total_attempts = 0
-        self.consecutive_correct = 0
+        # imgsz adaptativo según el tiempo medido por frame
+        self.adaptive_imgsz = None
+        if getattr(settings, 'DETECTOR_ADAPTIVE_IMGSZ', False):
+            if self.backend.dynamic_imgsz:
+                self.adaptive_imgsz = AdaptiveInputSize(
+                    getattr(settings, 'DETECTOR_IMGSZ_CHOICES', (320, 416, 512)),
+                    getattr(settings, 'DETECTOR_FRAME_BUDGET_MS', None) or 1000.0 / self.inference_fps,
+                    initial=self.backend.imgsz,
+                )
+            else:
+                print("⚠️ imgsz adaptativo desactivado: el modelo exportado tiene tamaño de entrada fijo")
+        self.last_frame_id = 0
+        self.snapshot = EMPTY_SNAPSHOT
+        self._snapshot_condition = threading.Condition()
+        self._inference_thread = None
+        self.use_pipeline = getattr(settings, 'DETECTOR_PIPELINE', True)
+        # Saltar la inferencia mientras ninguna sesión pueda cambiar de letra confirmada
+        self.skip_stable = getattr(settings, 'DETECTOR_SMOOTHING_SKIP_INFERENCE', False)
+        self.skipped_frames = 0
+        # Reutilizar el último resultado mientras la escena no cambie
+        self.motion_gate = None
+        if getattr(settings, 'DETECTOR_MOTION_GATING', True):
+            self.motion_gate = MotionGate(
+                threshold=getattr(settings, 'DETECTOR_MOTION_THRESHOLD', 4.0),
+                max_skip=getattr(settings, 'DETECTOR_MOTION_MAX_SKIP', 15),
+            )
+        self.pipeline = None
+        # Últimos JPEG publicados por frame_id (para /frame/<id>/)
+        self.recent_frames = OrderedDict()
+        self.recent_frames_size = getattr(settings, 'DETECTOR_RECENT_FRAMES', 4)
+        # Frames codificados una sola vez y repartidos a los espectadores del MJPEG
+        self.broadcaster = FrameBroadcaster()
+        self.encoder = load_encoder(
+            getattr(settings, 'DETECTOR_ENCODER', 'opencv'),
+            quality=getattr(settings, 'DETECTOR_ENCODE_QUALITY', 85),
+            max_width=getattr(settings, 'DETECTOR_STREAM_MAX_WIDTH', None),
+        )
+        # Funciones sin argumentos llamadas en cada publicación (canales push)
+        self._listeners = set()
+        
+        # Estado por cliente (suavizado y entrenamiento)
         self.training_alphabet = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
-        self.current_training_index = 0
+        self.sessions = SessionPool(
+            self.training_alphabet,
+            max_sessions=getattr(settings, 'DETECTOR_MAX_SESSIONS', 50),
+            idle_timeout=getattr(settings, 'DETECTOR_SESSION_IDLE_TIMEOUT', 300),
+        )
+        
+    def _create_tracker(self):
+        """Crear un RoiTracker con la configuración de settings (None si está desactivado)"""
+        if not self.roi_tracking:
+            return None
+        return RoiTracker(
+            padding=getattr(settings, 'DETECTOR_ROI_PADDING', 0.5),
+            full_frame_interval=getattr(settings, 'DETECTOR_ROI_FULL_FRAME_INTERVAL', 10),
+        )
+        
+    def _create_validation_cache(self):
+        """Crear un HandValidationCache (None si DETECTOR_VALIDATION_INTERVAL es 0)"""
+        max_age = getattr(settings, 'DETECTOR_VALIDATION_INTERVAL', 5)
+        if not max_age:
+            return None
+        return HandValidationCache(
+            iou_threshold=getattr(settings, 'DETECTOR_VALIDATION_IOU', 0.7),
+            max_age=max_age,
+        )
+        
+    def create_stream_quality(self):
+        """AdaptiveQuality para un espectador del MJPEG (None si está desactivado)"""
+        if not getattr(settings, 'DETECTOR_STREAM_ADAPTIVE', True):
+            return None
+        levels = [(self.encoder.quality, 1.0)]
+        levels += list(getattr(settings, 'DETECTOR_STREAM_LEVELS', ((70, 0.75), (55, 0.5))))
+        return AdaptiveQuality(levels, budget_ms=1000.0 / self.inference_fps)
+        
+    def _create_hands(self):
+        """Crear una instancia de MediaPipe Hands con configuración optimizada"""
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=1,
+            min_detection_confidence=0.7,  # Aumentado para mejor precisión
+            min_tracking_confidence=0.5
+        )
         
     def start_detection(self):
         """Iniciar la detección con diagnóstico mejorado"""
-        try:
-            print("=== INICIANDO DETECCIÓN DE CÁMARA ===")
+        with self._lifecycle_lock:
+            try:
+                print("=== INICIANDO DETECCIÓN DE CÁMARA ===")
             
-            # Liberar cualquier cámara previa
-            if self.cap is not None:
-                self.cap.release()
-                time.sleep(0.5)  # Esperar a que se libere
+                # Liberar cualquier cámara previa
+                if self.cap is not None:
+                    self.stop_detection()
+                    time.sleep(0.5)  # Esperar a que se libere
             
-            # Probar diferentes índices de cámara
-            camera_indices = [0, 1, 2]
-            success = False
+                # Probar diferentes índices de cámara
+                camera_indices = [0, 1, 2]
+                success = False
             
-            for camera_index in camera_indices:
-                print(f"Probando cámara índice {camera_index}...")
+                for camera_index in camera_indices:
+                    print(f"Probando cámara índice {camera_index}...")
                 
-                try:
-                    # Crear captura con configuración específica
-                    self.cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)  # DirectShow en Windows
+                    try:
+                        # Crear captura con configuración específica
+                        self.cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)  # DirectShow en Windows
                     
-                    if not self.cap.isOpened():
-                        print(f"No se pudo abrir cámara {camera_index}")
-                        continue
+                        if not self.cap.isOpened():
+                            print(f"No se pudo abrir cámara {camera_index}")
+                            continue
                     
-                    # Configurar propiedades optimizadas
-                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                    self.cap.set(cv2.CAP_PROP_FPS, 30)
-                    self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                        # Configurar propiedades optimizadas
+                        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.capture_size[0])
+                        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.capture_size[1])
+                        self.cap.set(cv2.CAP_PROP_FPS, 30)
+                        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
                     
-                    # Probar lectura de frame
-                    ret, test_frame = self.cap.read()
-                    if ret and test_frame is not None:
-                        height, width = test_frame.shape[:2]
-                        print(f"✅ Cámara {camera_index} funcionando - Resolución: {width}x{height}")
-                        success = True
-                        break
-                    else:
-                        print(f"❌ Cámara {camera_index} no puede leer frames")
-                        self.cap.release()
+                        # Probar lectura de frame
+                        ret, test_frame = self.cap.read()
+                        if ret and test_frame is not None:
+                            height, width = test_frame.shape[:2]
+                            print(f"✅ Cámara {camera_index} funcionando - Resolución: {width}x{height}")
+                            success = True
+                            break
+                        else:
+                            print(f"❌ Cámara {camera_index} no puede leer frames")
+                            self.cap.release()
                         
-                except Exception as e:
-                    print(f"❌ Error con cámara {camera_index}: {str(e)}")
-                    if self.cap:
-                        self.cap.release()
-                    continue
+                    except Exception as e:
+                        print(f"❌ Error con cámara {camera_index}: {str(e)}")
+                        if self.cap:
+                            self.cap.release()
+                        continue
             
-            if not success:
-                error_msg = """
-                ❌ No se pudo acceder a ninguna cámara.
+                if not success:
+                    error_msg = """
+                    ❌ No se pudo acceder a ninguna cámara.
                 
-                Soluciones sugeridas:
-                1. Verificar que la cámara esté conectada y funcionando
-                2. Cerrar otras aplicaciones que puedan estar usando la cámara (Zoom, Teams, etc.)
-                3. Verificar permisos de cámara en Windows
-                4. Reiniciar el navegador y la aplicación
-                5. Verificar drivers de la cámara
-                """
-                print(error_msg)
-                raise Exception("No se encontraron cámaras disponibles")
+                    Soluciones sugeridas:
+                    1. Verificar que la cámara esté conectada y funcionando
+                    2. Cerrar otras aplicaciones que puedan estar usando la cámara (Zoom, Teams, etc.)
+                    3. Verificar permisos de cámara en Windows
+                    4. Reiniciar el navegador y la aplicación
+                    5. Verificar drivers de la cámara
+                    """
+                    print(error_msg)
+                    raise Exception("No se encontraron cámaras disponibles")
             
-            self.is_running = True
-            print("✅ Detección iniciada correctamente")
-            return True
+                # Captura en segundo plano: process_frame solo toma el último frame
+                self.last_frame_id = 0
+                self.snapshot = EMPTY_SNAPSHOT
+                if self.motion_gate is not None:
+                    self.motion_gate.reset()
+                with self._snapshot_condition:
+                    self.recent_frames.clear()
+                self.grabber = FrameGrabber(self.cap, self.metrics)
+                self.grabber.start()
             
-        except Exception as e:
-            print(f"❌ Error iniciando detección: {str(e)}")
+                # Etapas en paralelo: detección, validación y codificación de frames consecutivos
+                self.pipeline = None
+                if self.use_pipeline:
+                    self.pipeline = self._create_pipeline()
+                    self.pipeline.start()
+            
+                # La inferencia avanza sola; las vistas solo leen el snapshot
+                self.is_running = True
+                self._inference_thread = threading.Thread(
+                    target=self._inference_loop, args=(self.grabber,),
+                    name='detector-inference', daemon=True
+                )
+                self._inference_thread.start()
+                print("✅ Detección iniciada correctamente")
+                return True
+            
+            except Exception as e:
+                print(f"❌ Error iniciando detección: {str(e)}")
+                self.is_running = False
+                if self.cap:
+                    self.cap.release()
+                    self.cap = None
+                raise e
+        
+    def stop_detection(self):
+        """Detener la detección"""
+        with self._lifecycle_lock:
             self.is_running = False
+            self._notify_listeners()
+            self.broadcaster.wake_all()
+            if self._inference_thread is not None:
+                self._inference_thread.join(timeout=2.0)
+                self._inference_thread = None
+            if self.pipeline is not None:
+                # Se conserva la referencia para consultar sus métricas
+                self.pipeline.stop()
+            if self.grabber is not None:
+                self.grabber.stop()
+                self.grabber = None
             if self.cap:
                 self.cap.release()
                 self.cap = None
-            raise e
-        
-    def stop_detection(self):
-        """Detener la detección"""
-        self.is_running = False
-        if self.cap:
-            self.cap.release()
             
-    def process_frame(self):
-        """Procesar un frame optimizado con frame skipping y caché"""
-        try:
-            # Control de tiempo para evitar procesamiento excesivo
-            current_time = time.time()
-            if current_time - self.last_detection_time < self.detection_interval:
-                # Retornar último frame conocido si está disponible
-                if self.last_frame is not None:
-                    return self.last_frame, self.current_letter, self.current_confidence
-                    
-            self.last_detection_time = current_time
-            
-            if not self.cap or not self.cap.isOpened():
-                print("Error: Cámara no está disponible")
-                return None, None, None
-                
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Error: No se pudo leer frame de la cámara")
-                return None, None, None
+    def _inference_loop(self, grabber):
+        """Procesar el frame más reciente al ritmo configurado y publicar el resultado"""
+        interval = 1.0 / self.inference_fps
+        while self.is_running:
+            started = time.perf_counter()
+            frame_id, frame = grabber.get_latest(self.last_frame_id, timeout=1.0)
+            if frame is not None:
+                self.last_frame_id = frame_id
+                # Solo las sesiones que miran la cámara: las de /upload-frames/ tienen su propio flujo
+                sessions = self.sessions.active(SOURCE_CAMERA)
+                engine = self.camera_engine(sessions)
+                now = time.time()
+                reuse = False
+                # En entrenamiento cada frame cuenta como intento: no se reutilizan resultados
+                training = any(session.training.active for session in sessions)
+                if self.motion_gate is not None and self.snapshot.frame is not None and not training and \
+                        not self.motion_gate.should_process(frame):
+                    # Escena casi igual al último frame procesado: se reutiliza su resultado
+                    reuse = True
+                elif self.skip_stable and self.snapshot.frame is not None and sessions and \
+                        all(session.can_skip_inference(now) for session in sessions):
+                    # Ninguna sesión puede cambiar de letra aún: solo se actualiza la imagen
+                    self.skipped_frames += 1
+                    reuse = True
                 
-            # Implementar frame skipping para mejor rendimiento
-            self.frame_skip_counter += 1
-            if self.frame_skip_counter < self.frame_skip_rate:
-                # Retornar último frame procesado si está disponible
-                if self.last_frame is not None:
-                    return self.last_frame, self.current_letter, self.current_confidence
-                    
-            self.frame_skip_counter = 0
+                # Los frames reutilizados pasan por las mismas etapas (sin YOLO ni MediaPipe)
+                # para publicarse en orden detrás de los que siguen en vuelo
+                item = (frame_id, frame, REUSE_RESULT if reuse else engine, sessions)
+                if self.pipeline is not None:
+                    # Bloquea solo si la primera etapa sigue ocupada con el frame anterior
+                    while self.is_running and not self.pipeline.submit(item, timeout=0.5):
+                        pass
+                else:
+                    self._process_serial(item)
             
-            # Voltear frame para efecto espejo
+            elapsed = time.perf_counter() - started
+            if elapsed < interval:
+                time.sleep(interval - elapsed)
+    
+    def _publish_reused(self, frame_id, frame, sessions):
+        """Publicar el frame nuevo (ya espejado) con la última detección publicada, sin YOLO ni MediaPipe"""
+        snapshot = self.snapshot.replace(frame_id=frame_id)
+        view = self._overlay_view(sessions, snapshot)
+        snapshot = self.render_snapshot(snapshot, frame, view)
+        for session in sessions:
+            session.refresh_frame(snapshot)
+        self._publish(snapshot, view)
+    
+    def _overlay_view(self, sessions, snapshot):
+        """Resultado que dibuja el overlay del servidor: letra suavizada y entrenamiento de la
+        sesión de la cámara más reciente (el MJPEG es uno solo para todos los espectadores)"""
+        return sessions[-1].result if sessions else snapshot
+    
+    def _process_serial(self, item):
+        """Sin pipeline: las mismas etapas, una detrás de otra en el hilo de inferencia"""
+        try:
+            self._publish_stage(self._analyze_stage(self._detect_stage(item)))
+        except Exception as e:
+            self.metrics.increment('inference_errors')
+            print(f"Error procesando frame: {e}")
+    
+    def _create_pipeline(self):
+        return Pipeline(
+            [
+                ('detect', self._detect_stage),
+                ('analyze', self._analyze_stage),
+                ('publish', self._publish_stage),
+            ],
+            queue_size=getattr(settings, 'DETECTOR_PIPELINE_QUEUE_SIZE', 1),
+        )
+    
+    def _detect_stage(self, item):
+        """Etapa 1: espejo + YOLO (o MediaPipe + clasificador de landmarks)"""
+        frame_id, frame, engine, sessions = item
+        with self.metrics.span('flip'):
             frame = cv2.flip(frame, 1)
-            output_frame = frame.copy()
-            
-            detected_letter = "NINGUNA"
-            confidence_percent = 0
-            
-            # YOLO detección con configuración optimizada
-            results = self.model.predict(
-                source=frame, 
-                conf=0.6,  # Aumentado para mejor precisión
-                show=False, 
-                verbose=False,
-                imgsz=640  # Tamaño de imagen optimizado
+        if engine == REUSE_RESULT:
+            return frame_id, frame, sessions, REUSE_RESULT, None, None
+        if engine == ENGINE_LANDMARKS:
+            snapshot, used_roi = self.classify_landmarks(frame_id, frame, self.tracker, render=False)
+            if snapshot is not None:
+                return frame_id, frame, sessions, snapshot, None, used_roi
+        (detections, used_roi), = self.detect_tracked([frame], self.tracker)
+        return frame_id, frame, sessions, None, detections, used_roi
+    
+    def _analyze_stage(self, item):
+        """Etapa 2: validación con MediaPipe y actualización del tracker"""
+        frame_id, frame, sessions, snapshot, detections, used_roi = item
+        if snapshot is REUSE_RESULT:
+            return frame_id, frame, sessions, snapshot
+        if snapshot is None:
+            snapshot = self.analyze(frame_id, frame, detections, render=False, validation=self.validation_cache)
+        if self.tracker is not None:
+            self.tracker.update(snapshot.box, snapshot.landmarks, used_roi, frame.shape)
+        return frame_id, frame, sessions, snapshot
+    
+    def _publish_stage(self, item):
+        """Etapa 3: codificar, aplicar el suavizado de cada sesión y publicar"""
+        frame_id, frame, sessions, snapshot = item
+        if snapshot is REUSE_RESULT:
+            # Aquí self.snapshot ya es el resultado del frame anterior en orden
+            self._publish_reused(frame_id, frame, sessions)
+            return
+        if self.client_overlay:
+            # Se codifica el frame limpio; el MJPEG dibuja después el resultado suavizado
+            snapshot = self.render_snapshot(snapshot, frame)
+        for session in sessions:
+            session.observe(snapshot)
+        view = self._overlay_view(sessions, snapshot)
+        if not self.client_overlay:
+            # El dibujo va en la imagen codificada: hace falta el resultado suavizado antes
+            snapshot = self.render_snapshot(snapshot, frame, view)
+            for session in sessions:
+                session.refresh_frame(snapshot)
+        self._publish(snapshot, view)
+    
+    def _publish(self, snapshot, view=None):
+        """Publicar un nuevo snapshot y despertar a los lectores en espera.
+
+        view es el resultado (suavizado) que dibuja el overlay del MJPEG.
+        """
+        self.metrics.increment('frames_camera')
+        with self._snapshot_condition:
+            self.snapshot = snapshot
+            if snapshot.frame is not None:
+                self.recent_frames[snapshot.frame_id] = snapshot.frame
+                while len(self.recent_frames) > self.recent_frames_size:
+                    self.recent_frames.popitem(last=False)
+        if snapshot.frame is not None:
+            annotate = None
+            if self.client_overlay:
+                # El MJPEG no tiene canvas: dibujar el overlay solo si algún espectador lo pide
+                view = view or snapshot
+                annotate = functools.partial(
+                    self.draw_overlay, letter=view.letter, confidence_percent=view.confidence,
+                    box=snapshot.box, landmarks=snapshot.landmarks, training=view.training,
+                )
+            self.broadcaster.publish(
+                EncodedFrame(snapshot.frame_id, snapshot.image, self.encoder, snapshot.frame, annotate)
             )
+        self._notify_listeners()
+    
+    def add_listener(self, callback):
+        """Registrar un aviso de nuevo snapshot (se llama desde el hilo de inferencia)"""
+        with self._snapshot_condition:
+            self._listeners.add(callback)
+    
+    def remove_listener(self, callback):
+        with self._snapshot_condition:
+            self._listeners.discard(callback)
+    
+    def _notify_listeners(self):
+        with self._snapshot_condition:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error notificando snapshot: {e}")
+    
+    def get_snapshot(self):
+        """Obtener el último resultado publicado (sin procesar nada)"""
+        return self.snapshot
+    
+    def get_frame(self, frame_id):
+        """JPEG de un frame reciente por su id (None si ya salió del buffer)"""
+        with self._snapshot_condition:
+            return self.recent_frames.get(frame_id)
+    
+    def detect(self, frames):
+        """Ejecutar YOLO sobre una lista de frames a través del planificador de lotes"""
+        futures = self.batcher.submit_many(frames)
+        return [future.result() for future in futures]
+    
+    def _predict(self, frames):
+        """Una sola llamada a YOLO sobre un lote de frames"""
+        with self._model_lock:
+            started = time.perf_counter()
+            results = self.backend.predict(frames)
+            elapsed = time.perf_counter() - started
+            self.metrics.observe('yolo', elapsed)
+            if self.adaptive_imgsz is None:
+                return results
             
-            for result in results:
-                if result.boxes is not None and len(result.boxes) > 0:
-                    # Procesar solo la detección con mayor confianza
-                    best_box = max(result.boxes, key=lambda x: float(x.conf[0]))
-                    
-                    # Coordenadas del bounding box
-                    x1, y1, x2, y2 = map(int, best_box.xyxy[0])
-                    cv2.rectangle(output_frame, (x1, y1), (x2, y2), (0, 255, 0), 3)
-                    
-                    # Clase y confianza YOLO
-                    class_id = int(best_box.cls[0])
-                    confidence = float(best_box.conf[0]) * 100
-                    letter = self.class_names.get(class_id, "?")
-                    
-                    # Validación del tamaño del recorte
-                    hand_region = frame[y1:y2, x1:x2]
-                    if hand_region.size == 0 or hand_region.shape[0] < 50 or hand_region.shape[1] < 50:
-                        continue
-                        
-                    # Validación con MediaPipe (solo si YOLO tiene alta confianza)
-                    valid = True
-                    if confidence > 60:  # Solo validar con MediaPipe si YOLO está confiado
-                        hand_region_rgb = cv2.cvtColor(hand_region, cv2.COLOR_BGR2RGB)
-                        results_hands = self.hands.process(hand_region_rgb)
-                        
-                        if results_hands.multi_hand_landmarks:
-                            for hand_landmarks in results_hands.multi_hand_landmarks:
-                                # Convertir coordenadas relativas a absolutas de forma optimizada
-                                h_region, w_region = hand_region.shape[:2]
-                                h_frame, w_frame = frame.shape[:2]
-                                
-                                for landmark in hand_landmarks.landmark:
-                                    landmark.x = (landmark.x * w_region + x1) / w_frame
-                                    landmark.y = (landmark.y * h_region + y1) / h_frame
-                                
-                                # Dibujar landmarks de forma más eficiente
-                                self.mp_drawing.draw_landmarks(
-                                    output_frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS,
-                                    landmark_drawing_spec=self.mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2, circle_radius=2),
-                                    connection_drawing_spec=self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2)
-                                )
-                        else:
-                            valid = False
-                    
-                    # Validación y suavizado temporal
-                    if valid:
-                        self.history.append(letter)
-                        detected_letter = letter
-                        confidence_percent = int(confidence)
-                        
-                        # Suavizado temporal mejorado
-                        if len(self.history) >= 3:  # Requerir al menos 3 detecciones
-                            counter = Counter(self.history)
-                            most_common = counter.most_common(1)[0]
-                            if most_common[1] >= 2:  # Al menos 2 coincidencias
-                                detected_letter = most_common[0]
-                    
-                    # Mostrar información en pantalla de forma optimizada
-                    text = f"{detected_letter} ({confidence_percent}%)"
-                    
-                    # Colores según confianza
-                    if confidence_percent >= 70:
-                        color = (0, 255, 0)  # Verde
-                    elif confidence_percent >= 50:
-                        color = (0, 255, 255)  # Amarillo
-                    else:
-                        color = (0, 165, 255)  # Naranja
-                    
-                    # Texto más grande y legible
-                    cv2.putText(output_frame, text, (x1, y1 - 15),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 4)
-                    
-                    break  # Solo procesar la mejor detección
-            
-            # Información general optimizada
-            cv2.putText(output_frame, "DETECTOR DE LENGUAJE DE SEÑAS", (10, 35), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 3)
-            
-            cv2.putText(output_frame, f"LETRA: {detected_letter}", (10, 80), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255, 255, 255), 3)
-            
-            cv2.putText(output_frame, f"CONFIANZA: {confidence_percent}%", (10, 120), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255, 255, 255), 3)
-            
-            # Actualizar estado
-            self.current_letter = detected_letter
-            self.current_confidence = confidence_percent
-            
-            # Verificar entrenamiento si está activo
-            training_result = None
-            if self.training_mode:
-                training_result = self.check_training_success(detected_letter, confidence_percent)
-                
-                # Agregar información de entrenamiento en pantalla
-                if self.target_letter:
-                    cv2.putText(output_frame, f"OBJETIVO: {self.target_letter}", (10, 150), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 0), 3)
-                    
-                    cv2.putText(output_frame, f"ACIERTOS: {self.correct_detections}/{self.total_attempts}", (10, 190), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            
-            # Codificar frame como JPEG con calidad optimizada
-            encode_params = [cv2.IMWRITE_JPEG_QUALITY, 85]  # Calidad reducida para mejor rendimiento
-            _, buffer = cv2.imencode('.jpg', output_frame, encode_params)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            # Actualizar caché con el último frame procesado
-            self.last_frame = frame_base64
-            
-            # Gestión de caché para evitar uso excesivo de memoria
-            if len(self.frame_cache) >= self.cache_max_size:
-                self.frame_cache.clear()
+            frame_ms = elapsed * 1000 / len(frames)
+            self.backend.imgsz = self.adaptive_imgsz.update(frame_ms)
+            return results
+    
+    def engine_for(self, session):
+        """Motor efectivo de una sesión (YOLO si no hay clasificador de landmarks)"""
+        engine = session.engine or self.default_engine
+        if engine == ENGINE_LANDMARKS and self.landmark_classifier is None:
+            return ENGINE_YOLO
+        return engine
+    
+    def camera_engine(self, sessions=None):
+        """Motor del bucle de la cámara: un solo análisis por frame, landmarks solo si todas
+        las sesiones de la cámara lo eligieron"""
+        if sessions is None:
+            sessions = self.sessions.active(SOURCE_CAMERA)
+        if sessions and all(self.engine_for(session) == ENGINE_LANDMARKS for session in sessions):
+            return ENGINE_LANDMARKS
+        return ENGINE_YOLO
+    
+    def process_frame(self, frame_id, frame, engine=ENGINE_YOLO):
+        """Ejecutar YOLO + MediaPipe sobre un frame de la cámara y construir el snapshot"""
+        try:
+            # Voltear frame para efecto espejo
+            with self.metrics.span('flip'):
+                frame = cv2.flip(frame, 1)
+            if engine == ENGINE_LANDMARKS:
+                snapshot, used_roi = self.classify_landmarks(frame_id, frame, self.tracker)
+                if snapshot is not None:
+                    if self.tracker is not None:
+                        self.tracker.update(snapshot.box, snapshot.landmarks, used_roi, frame.shape)
+                    return snapshot
             
-            return frame_base64, detected_letter, confidence_percent, training_result
+            # YOLO (motor principal o respaldo cuando el clasificador no está seguro)
+            (detections, used_roi), = self.detect_tracked([frame], self.tracker)
+            snapshot = self.analyze(frame_id, frame, detections, validation=self.validation_cache)
+            if self.tracker is not None:
+                self.tracker.update(snapshot.box, snapshot.landmarks, used_roi, frame.shape)
+            return snapshot
             
         except Exception as e:
+            self.metrics.increment('inference_errors')
             print(f"Error procesando frame: {e}")
-            return None, None, None, None
+            return None
     
-    def get_current_detection(self):
-        """Obtener la detección actual"""
-        return {
-            'letter': self.current_letter,
-            'confidence': self.current_confidence
-        }
+    def process_batch(self, frames, session):
+        """Procesar frames enviados por el navegador con un solo predict en lote.
+
+        Los frames se analizan en orden y pasan por el suavizado y entrenamiento
+        de la sesión; no se dibujan ni se codifican (el cliente ya tiene su video).
+        """
+        with self.metrics.span('flip'):
+            frames = [cv2.flip(frame, 1) for frame in frames]
+        self.metrics.increment('frames_upload', len(frames))
+        if not frames:
+            return []
+        if session.tracker is None:
+            session.tracker = self._create_tracker()
+        if session.validation_cache is None:
+            session.validation_cache = self._create_validation_cache()
+            
+        analyzed = [None] * len(frames)
+        pending = list(range(len(frames)))
+        if self.engine_for(session) == ENGINE_LANDMARKS:
+            pending = []
+            for index, frame in enumerate(frames):
+                snapshot, used_roi = self.classify_landmarks(index, frame, session.tracker, render=False)
+                if snapshot is None:
+                    pending.append(index)
+                else:
+                    analyzed[index] = (snapshot, used_roi)
+        
+        # YOLO en un solo lote para los frames que el clasificador no resolvió
+        if pending:
+            tracked = self.detect_tracked([frames[index] for index in pending], session.tracker)
+            for index, (detections, used_roi) in zip(pending, tracked):
+                snapshot = self.analyze(index, frames[index], detections, render=False,
+                                        validation=session.validation_cache)
+                analyzed[index] = (snapshot, used_roi)
+        
+        results = []
+        for frame, (snapshot, used_roi) in zip(frames, analyzed):
+            if session.tracker is not None:
+                session.tracker.update(snapshot.box, snapshot.landmarks, used_roi, frame.shape)
+            results.append(session.observe(snapshot))
+        return results
     
-    def start_training_mode(self):
-        """Iniciar modo entrenamiento"""
-        import random
-        self.training_mode = True
-        self.target_letter = random.choice(self.training_alphabet)
-        self.correct_detections = 0
-        self.total_attempts = 0
-        self.consecutive_correct = 0
-        print(f"Modo entrenamiento iniciado. Letra objetivo: {self.target_letter}")
+    def classify_landmarks(self, frame_id, frame, tracker, render=True):
+        """Letra por landmarks de MediaPipe sobre el recorte del tracker (o el frame completo).
+
+        Devuelve (snapshot, se_usó_recorte), o (None, ...) si no hay mano o el
+        clasificador no llega a DETECTOR_LANDMARK_MIN_CONFIDENCE.
+        """
+        region = tracker.region(frame.shape) if tracker is not None else None
+        crop = RoiTracker.crop(frame, region) if region is not None else frame
+        with self.hands_pool.acquire() as hands, self.metrics.span('mediapipe'):
+            results_hands = hands.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+        if not results_hands.multi_hand_landmarks:
+            return None, region is not None
         
-    def stop_training_mode(self):
-        """Detener modo entrenamiento"""
-        self.training_mode = False
-        self.target_letter = None
+        # Landmarks del recorte -> píxeles del frame
+        h_crop, w_crop = crop.shape[:2]
+        offset = region[:2] if region is not None else (0, 0)
+        hand_landmarks = results_hands.multi_hand_landmarks[0]
+        points = np.array([(landmark.x, landmark.y) for landmark in hand_landmarks.landmark], dtype=np.float32)
+        points = points * (w_crop, h_crop) + offset
         
-    def get_next_training_letter(self):
-        """Obtener siguiente letra para entrenar"""
-        import random
-        self.target_letter = random.choice(self.training_alphabet)
-        return self.target_letter
+        class_id, probability = self.landmark_classifier.predict(points)
+        if probability < self.landmark_min_confidence:
+            return None, region is not None
         
-    def check_training_success(self, detected_letter, confidence):
-        """Verificar si la detección es correcta en modo entrenamiento"""
-        if not self.training_mode or not self.target_letter:
-            return None
+        h_frame, w_frame = frame.shape[:2]
+        x1, y1 = np.maximum(points.min(axis=0), 0).astype(int)
+        x2, y2 = np.minimum(points.max(axis=0), (w_frame, h_frame)).astype(int)
+        snapshot = self._build_snapshot(
+            frame_id, frame, self.class_names.get(class_id, "?"), int(probability * 100),
+            (int(x1), int(y1), int(x2), int(y2)), normalized_landmarks(points, frame.shape),
+            render, engine=ENGINE_LANDMARKS,
+        )
+        return snapshot, region is not None
+    
+    def detect_tracked(self, frames, tracker):
+        """Detectar sobre el recorte del tracker; los frames sin mano se reintentan completos.
+
+        Devuelve [(detecciones en coordenadas del frame, se_usó_recorte), ...].
+        """
+        region = tracker.region(frames[0].shape) if tracker is not None else None
+        if region is None:
+            return [(detections, False) for detections in self.detect(frames)]
             
-        self.total_attempts += 1
+        crops = [RoiTracker.crop(frame, region) for frame in frames]
+        results = [
+            (RoiTracker.to_frame_coordinates(detections, region), True)
+            for detections in self.detect(crops)
+        ]
+        
+        # Mano perdida en el recorte: repetir esos frames completos en un solo lote
+        lost = [index for index, (detections, _) in enumerate(results) if len(detections) == 0]
+        if lost:
+            for index, detections in zip(lost, self.detect([frames[index] for index in lost])):
+                results[index] = (detections, False)
+        return results
+    
+    def analyze(self, frame_id, frame, detections, render=True, validation=None):
+        """Validar la mejor caja YOLO con MediaPipe y opcionalmente codificar el frame.
+
+        validation es el HandValidationCache del flujo de frames (cámara o sesión).
+        """
+        detected_letter = "NINGUNA"
+        confidence_percent = 0
+        box = None
+        landmarks = None
         
-        if detected_letter == self.target_letter and confidence >= 70:
-            self.correct_detections += 1
-            self.consecutive_correct += 1
+        if len(detections) > 0:
+            # Procesar solo la detección con mayor confianza
+            best_box = detections[int(detections[:, 4].argmax())]
             
-            # Obtener nueva letra después de éxito
-            import random
-            old_letter = self.target_letter
-            self.target_letter = random.choice(self.training_alphabet)
+            # Coordenadas del bounding box
+            x1, y1, x2, y2 = map(int, best_box[:4])
             
-            return {
-                'success': True,
-                'message': f'¡FELICITACIONES! 🎉 Hiciste correctamente la "{old_letter}"',
-                'next_letter': self.target_letter,
-                'stats': {
-                    'correct': self.correct_detections,
-                    'total': self.total_attempts,
-                    'consecutive': self.consecutive_correct,
-                    'accuracy': round((self.correct_detections / self.total_attempts) * 100, 1) if self.total_attempts > 0 else 0
-                }
-            }
-        else:
-            self.consecutive_correct = 0
-            if detected_letter != self.target_letter and detected_letter != "NINGUNA":
-                return {
-                    'success': False,
-                    'message': f'Casi! Detecté "{detected_letter}" pero necesito "{self.target_letter}"',
-                    'target_letter': self.target_letter
-                }
-        
-        return None
-        
-    def get_training_status(self):
-        """Obtener estado del entrenamiento"""
-        if not self.training_mode:
-            return None
+            # Clase y confianza YOLO
+            class_id = int(best_box[5])
+            confidence = float(best_box[4]) * 100
+            letter = self.class_names.get(class_id, "?")
             
+            # Validación del tamaño del recorte
+            hand_region = frame[y1:y2, x1:x2]
+            if hand_region.size > 0 and hand_region.shape[0] >= 50 and hand_region.shape[1] >= 50:
+                # Validación con MediaPipe (solo si YOLO tiene alta confianza)
+                valid = True
+                if confidence > 60:  # Solo validar con MediaPipe si YOLO está confiado
+                    # Mano quieta: reutilizar la última validación en vez de repetir MediaPipe
+                    if validation is not None:
+                        landmarks = validation.lookup((x1, y1, x2, y2), frame.shape)
+                    
+                    if landmarks is None:
+                        hand_region_rgb = cv2.cvtColor(hand_region, cv2.COLOR_BGR2RGB)
+                        with self.hands_pool.acquire() as hands, self.metrics.span('mediapipe'):
+                            results_hands = hands.process(hand_region_rgb)
+                        
+                        if results_hands.multi_hand_landmarks:
+                            # Convertir coordenadas relativas al recorte a píxeles y luego relativas al frame
+                            hand_landmarks = results_hands.multi_hand_landmarks[0]
+                            h_region, w_region = hand_region.shape[:2]
+                            points = np.array([(landmark.x, landmark.y) for landmark in hand_landmarks.landmark],
+                                              dtype=np.float32)
+                            points = points * (w_region, h_region) + (x1, y1)
+                            landmarks = normalized_landmarks(points, frame.shape)
+                            if validation is not None:
+                                validation.store((x1, y1, x2, y2), points)
+                        else:
+                            valid = False
+                            if validation is not None:
+                                validation.invalidate()
+                
+                # Detección validada (el suavizado lo aplica cada sesión)
+                if valid:
+                    detected_letter = letter
+                    confidence_percent = int(confidence)
+                    box = (x1, y1, x2, y2)
+        
+        return self._build_snapshot(
+            frame_id, frame, detected_letter, confidence_percent, box, landmarks, render, engine=ENGINE_YOLO
+        )
+    
+    def _build_snapshot(self, frame_id, frame, detected_letter, confidence_percent, box, landmarks, render, engine):
+        """Armar el DetectionSnapshot y codificar el frame si render"""
+        snapshot = DetectionSnapshot(
+            frame_id=frame_id,
+            frame=None,
+            image=None,
+            letter=detected_letter,
+            confidence=confidence_percent,
+            box=box,
+            landmarks=landmarks,
+            engine=engine,
+            training=None,
+            training_result=None,
+            timestamp=time.time(),
+        )
+        return self.render_snapshot(snapshot, frame) if render else snapshot
+    
+    def render_snapshot(self, snapshot, frame, view=None):
+        """Codificar el frame del snapshot (dibujando antes si el overlay no es del cliente).
+
+        view es el resultado a dibujar (letra suavizada y entrenamiento); por defecto el snapshot.
+        """
+        # Con overlay en el cliente se codifica el frame limpio (sin copia ni dibujo);
+        # el MJPEG lo dibuja aparte solo si alguien lo está viendo
+        image = frame
+        if not self.client_overlay:
+            view = view or snapshot
+            image = self.draw_overlay(frame, view.letter, view.confidence, snapshot.box, snapshot.landmarks,
+                                      view.training)
+        # Codificar con el codificador configurado; bytes tal cual, sin base64
+        with self.metrics.span('encode'):
+            data = self.encoder.encode(image)
+        return snapshot.replace(frame=data, image=image)
+    
+    def draw_overlay(self, image, letter, confidence_percent, box, landmarks, training=None):
+        """Dibujar caja, letra, landmarks y el estado del entrenamiento sobre una copia del frame"""
+        with self.metrics.span('draw'):
+            return self.overlay.draw(image, letter, confidence_percent, box, landmarks, training)
+    
+    def metric_samples(self):
+        """Contadores e indicadores para /metrics: (nombre, tipo, ayuda, etiquetas, valor)"""
+        skipped = 'Frames de la cámara publicados sin inferencia'
+        validation = 'Consultas a la caché de validación de MediaPipe'
+        dropped = 'Frames descartados'
+        errors = 'Errores durante la inferencia'
+        samples = [
+            ('running', 'gauge', 'Cámara local encendida', {}, int(self.is_running)),
+            ('sessions', 'gauge', 'Sesiones activas del detector', {}, len(self.sessions)),
+            ('imgsz', 'gauge', 'Tamaño de entrada actual de YOLO', {}, self.backend.imgsz),
+            ('frames_total', 'counter', 'Frames analizados y publicados', {'source': 'camera'},
+             self.metrics.counter('frames_camera')),
+            ('frames_total', 'counter', 'Frames analizados y publicados', {'source': 'upload'},
+             self.metrics.counter('frames_upload')),
+            ('frames_skipped_total', 'counter', skipped, {'reason': 'smoothing'}, self.skipped_frames),
+            ('inference_errors_total', 'counter', errors, {'where': 'camera'},
+             self.metrics.counter('inference_errors')),
+        ]
+        if self.motion_gate is not None:
+            samples.append(('frames_skipped_total', 'counter', skipped, {'reason': 'motion'},
+                            self.motion_gate.skipped))
+        if self.validation_cache is not None:
+            samples.append(('validation_cache_total', 'counter', validation, {'result': 'hit'},
+                            self.validation_cache.hits))
+            samples.append(('validation_cache_total', 'counter', validation, {'result': 'miss'},
+                            self.validation_cache.misses))
+        if self.pipeline is not None:
+            stages = self.pipeline.stats()
+            samples.append(('dropped_frames_total', 'counter', dropped, {'where': 'pipeline'},
+                            sum(stage['dropped'] for stage in stages.values())))
+            samples.append(('inference_errors_total', 'counter', errors, {'where': 'pipeline'},
+                            sum(stage['errors'] for stage in stages.values())))
+        samples.append(('dropped_frames_total', 'counter', dropped, {'where': 'video_feed'},
+                        self.broadcaster.stats()['dropped']))
+        samples.append(('batcher_errors_total', 'counter', 'Lotes de YOLO que fallaron', {},
+                        self.batcher.stats()['errors']))
+        return samples
+    
+    def frames_processed(self):
+        """Frames publicados por la cámara más frames subidos por los navegadores"""
+        return self.metrics.counter('frames_camera') + self.metrics.counter('frames_upload')
+    
+    def warm_up(self):
+        """Inferencia de prueba sobre un frame negro para inicializar YOLO y MediaPipe"""
+        width, height = self.capture_size
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        with self._model_lock:
+            self.backend.predict([frame])
+        with self.hands_pool.acquire() as hands:
+            hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    
+    def get_current_detection(self):
+        """Obtener la detección actual"""
+        snapshot = self.snapshot
         return {
-            'active': True,
-            'target_letter': self.target_letter,
-            'correct_detections': self.correct_detections,
-            'total_attempts': self.total_attempts,
-            'consecutive_correct': self.consecutive_correct,
-            'accuracy': round((self.correct_detections / self.total_attempts) * 100, 1) if self.total_attempts > 0 else 0
+            'letter': snapshot.letter,
+            'confidence': snapshot.confidence
         }
+    
+class DetectorLoader:
+    """Crea el detector compartido en el primer uso (o en segundo plano al arrancar el servidor).
+
+    Estados: 'idle' (sin cargar), 'warming', 'ready' o 'failed'. Si la carga
+    falla (por ejemplo falta best.pt) se vuelve a intentar en el siguiente uso.
+    """
+    
+    IDLE, WARMING, READY, FAILED = 'idle', 'warming', 'ready', 'failed'
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instance = None
+        self._warmup_thread = None
+        self.status = self.IDLE
+        self.error = None
+        self.load_seconds = None
+    
+    @property
+    def ready(self):
+        return self._instance is not None
+    
+    def get(self):
+        """La instancia del detector; la crea (y la calienta) si todavía no existe"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                self._load()
+            return self._instance
+    
+    def _load(self):
+        self.status = self.WARMING
+        started = time.perf_counter()
+        try:
+            instance = self._factory()
+            instance.warm_up()
+        except Exception as e:
+            self.status = self.FAILED
+            self.error = str(e)
+            print(f"❌ No se pudo cargar el detector: {e}")
+            raise
+        self.load_seconds = round(time.perf_counter() - started, 2)
+        self.error = None
+        self._instance = instance
+        self.status = self.READY
+        print(f"✅ Detector listo en {self.load_seconds} s")
+    
+    def warm_up_in_background(self):
+        """Cargar el detector en un hilo aparte para que la primera petición no espere"""
+        with self._lock:
+            if self._instance is not None or (self._warmup_thread and self._warmup_thread.is_alive()):
+                return
+            self.status = self.WARMING
+            self._warmup_thread = threading.Thread(target=self._warm_up, name='detector-warmup', daemon=True)
+            self._warmup_thread.start()
+    
+    def _warm_up(self):
+        try:
+            self.get()
+        except Exception:
+            pass  # El estado 'failed' y el error quedan registrados
+    
+    def state(self):
+        return {
+            'status': self.status,
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+        }
+
+
+detector_loader = DetectorLoader(SignLanguageDetector)
 
-# Instancia global del detector
-detector = SignLanguageDetector()
+# Instancia global del detector: se crea en el primer acceso a un atributo
+detector = SimpleLazyObject(detector_loader.get)
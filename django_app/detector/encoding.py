@@ -0,0 +1,165 @@
+import threading
+
+import cv2
+
+
+class FrameEncoder:
+    """Interfaz común de los codificadores de frames para el navegador.
+
+    encode(frame, quality, scale) devuelve los bytes de la imagen; scale < 1 y
+    max_width reducen la resolución antes de codificar.
+    """
+
+    name = None
+    content_type = 'image/jpeg'
+
+    def __init__(self, quality=85, max_width=None):
+        self.quality = quality
+        self.max_width = max_width
+
+    def encode(self, frame, quality=None, scale=1.0):
+        return self._encode(self.resize(frame, scale), quality or self.quality)
+
+    def resize(self, frame, scale=1.0):
+        height, width = frame.shape[:2]
+        target_width = width * scale
+        if self.max_width:
+            target_width = min(target_width, self.max_width)
+        if target_width >= width:
+            return frame
+        target_height = int(round(height * target_width / width))
+        return cv2.resize(frame, (int(target_width), target_height), interpolation=cv2.INTER_AREA)
+
+    def _encode(self, frame, quality):
+        raise NotImplementedError
+
+
+class OpenCVJpegEncoder(FrameEncoder):
+    """JPEG con cv2.imencode"""
+
+    name = 'opencv'
+
+    def _encode(self, frame, quality):
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes()
+
+
+class TurboJpegEncoder(FrameEncoder):
+    """JPEG con libjpeg-turbo (PyTurboJPEG): submuestreo 4:2:0 y DCT rápida"""
+
+    name = 'turbojpeg'
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        from turbojpeg import TJFLAG_FASTDCT, TJSAMP_420, TurboJPEG
+        self.jpeg = TurboJPEG()
+        self.subsample = TJSAMP_420
+        self.flags = TJFLAG_FASTDCT
+
+    def _encode(self, frame, quality):
+        return self.jpeg.encode(frame, quality=quality, jpeg_subsample=self.subsample, flags=self.flags)
+
+
+class WebPEncoder(FrameEncoder):
+    """WebP con cv2.imencode (archivos más chicos, más CPU que JPEG)"""
+
+    name = 'webp'
+    content_type = 'image/webp'
+
+    def _encode(self, frame, quality):
+        _, buffer = cv2.imencode('.webp', frame, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        return buffer.tobytes()
+
+
+ENCODERS = {
+    OpenCVJpegEncoder.name: OpenCVJpegEncoder,
+    TurboJpegEncoder.name: TurboJpegEncoder,
+    WebPEncoder.name: WebPEncoder,
+}
+
+
+def load_encoder(name, **options):
+    """Crear el codificador configurado (vuelve a OpenCV si falta la librería opcional)"""
+    if name not in ENCODERS:
+        raise ValueError(f"Codificador desconocido: {name} (opciones: {', '.join(ENCODERS)})")
+    try:
+        return ENCODERS[name](**options)
+    except (ImportError, OSError) as e:
+        print(f"⚠️ Codificador {name} no disponible ({e}); usando OpenCV JPEG")
+        return OpenCVJpegEncoder(**options)
+
+
+class EncodedFrame:
+    """Frame publicado con sus variantes codificadas (calidad, escala) compartidas.
+
+    La variante por defecto la codifica el bucle de inferencia; las demás se
+    codifican una sola vez, la primera vez que algún espectador las pide.
+    annotate(image) dibuja el overlay para las variantes pedidas con annotated=True
+    (None si la imagen ya viene dibujada).
+    """
+
+    def __init__(self, frame_id, image, encoder, data, annotate=None):
+        self.frame_id = frame_id
+        self.image = image
+        self.encoder = encoder
+        self.annotate = annotate
+        self._annotated_image = None
+        self._variants = {(encoder.quality, 1.0, False): data}
+        self._lock = threading.Lock()
+
+    def get(self, quality, scale, annotated=False):
+        annotated = annotated and self.annotate is not None
+        key = (quality, scale, annotated)
+        with self._lock:
+            data = self._variants.get(key)
+            if data is None:
+                image = self.image
+                if annotated:
+                    if self._annotated_image is None:
+                        self._annotated_image = self.annotate(self.image)
+                    image = self._annotated_image
+                data = self._variants[key] = self.encoder.encode(image, quality, scale)
+            return data
+
+
+class AdaptiveQuality:
+    """Nivel (calidad, escala) de un espectador según el tiempo que tarda en recibir cada frame.
+
+    Si el envío supera el intervalo entre frames se baja un nivel; si sobra
+    holgura se vuelve a subir.
+    """
+
+    def __init__(self, levels, budget_ms, alpha=0.3, warmup=3, headroom=0.5):
+        self.levels = list(levels)
+        self.budget_ms = budget_ms
+        self.alpha = alpha
+        self.warmup = warmup
+        self.headroom = headroom
+        self.index = 0
+        self.average_ms = None
+        self.samples = 0
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def update(self, send_ms):
+        """Registrar el tiempo de envío de un frame y devolver el nivel a usar"""
+        if self.average_ms is None:
+            self.average_ms = send_ms
+        else:
+            self.average_ms += self.alpha * (send_ms - self.average_ms)
+        self.samples += 1
+        if self.samples < self.warmup:
+            return self.level
+
+        current = self.index
+        if self.average_ms > self.budget_ms and self.index < len(self.levels) - 1:
+            self.index += 1
+        elif self.average_ms < self.budget_ms * self.headroom and self.index > 0:
+            self.index -= 1
+
+        if self.index != current:
+            self.average_ms = None
+            self.samples = 0
+        return self.level
@@ -0,0 +1,258 @@
+import ast
+import bisect
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def find_datasets(root):
+    """Carpetas dataset* con data.yaml dentro de root"""
+    return sorted(
+        path for path in glob.glob(os.path.join(root, 'dataset*'))
+        if os.path.exists(os.path.join(path, 'data.yaml'))
+    )
+
+
+def read_class_names(data_yaml):
+    """Leer la lista 'names' de un data.yaml de Roboflow/ultralytics"""
+    with open(data_yaml, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('names:'):
+                return list(ast.literal_eval(line.split(':', 1)[1].strip()))
+    raise ValueError(f"No se encontró 'names' en {data_yaml}")
+
+
+def class_map_for(dataset_dir, model_class_names):
+    """Mapa id de clase del dataset -> id de clase del modelo (por letra).
+
+    Las clases que el modelo no conoce (por ejemplo 'EYE' en dataset3) se omiten.
+    """
+    letter_to_model = {letter: class_id for class_id, letter in model_class_names.items()}
+    names = read_class_names(os.path.join(dataset_dir, 'data.yaml'))
+    return {
+        dataset_id: letter_to_model[name]
+        for dataset_id, name in enumerate(names) if name in letter_to_model
+    }
+
+
+def iter_split(dataset_dir, split):
+    """(ruta_imagen, ruta_etiqueta) de un split (train/valid/test) en orden estable"""
+    images_dir = os.path.join(dataset_dir, split, 'images')
+    labels_dir = os.path.join(dataset_dir, split, 'labels')
+    if not os.path.isdir(images_dir):
+        return
+    for name in sorted(os.listdir(images_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in IMAGE_EXTENSIONS:
+            yield os.path.join(images_dir, name), os.path.join(labels_dir, stem + '.txt')
+
+
+def read_labels(label_path, width, height, class_map):
+    """Etiquetas YOLO (cls cx cy w h normalizados) -> arreglo Mx5 (cls, x1, y1, x2, y2) en píxeles"""
+    rows = []
+    if os.path.exists(label_path):
+        with open(label_path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 5 or int(parts[0]) not in class_map:
+                    continue
+                cx, cy, w, h = (float(value) for value in parts[1:5])
+                rows.append((
+                    class_map[int(parts[0])],
+                    (cx - w / 2) * width, (cy - h / 2) * height,
+                    (cx + w / 2) * width, (cy + h / 2) * height,
+                ))
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+
+def load_sample(sample):
+    """(ruta_imagen, ruta_etiqueta, class_map) -> (ruta_imagen, frame, etiquetas, ms de decodificación).
+
+    Está a nivel de módulo (y sin Django) para poder ejecutarse en un ProcessPoolExecutor.
+    """
+    image_path, label_path, class_map = sample
+    started = time.perf_counter()
+    frame = cv2.imread(image_path)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if frame is None:
+        return image_path, None, None, elapsed_ms
+    height, width = frame.shape[:2]
+    return image_path, frame, read_labels(label_path, width, height, class_map), elapsed_ms
+
+
+def stream_samples(samples, workers=0, prefetch=32):
+    """Decodificar muestras en procesos aparte, en orden y con a lo sumo prefetch en vuelo.
+
+    Con workers=0 se decodifica en el mismo proceso.
+    """
+    if not workers:
+        for sample in samples:
+            yield load_sample(sample)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for sample in samples:
+            pending.append(pool.submit(load_sample, sample))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def box_iou(box, boxes):
+    """IoU de una caja xyxy contra un arreglo Nx4"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+class DetectionEvaluator:
+    """Acumula detecciones por imagen y calcula AP con IoU 0.5 por clase"""
+
+    def __init__(self, num_classes, iou_threshold=0.5):
+        self.num_classes = num_classes
+        self.iou_threshold = iou_threshold
+        self.scores = [[] for _ in range(num_classes)]
+        self.matches = [[] for _ in range(num_classes)]
+        self.ground_truth = np.zeros(num_classes, dtype=np.int64)
+        self.images = 0
+
+    def add(self, detections, ground_truth):
+        """detections Nx6 (x1, y1, x2, y2, conf, cls); ground_truth Mx5 (cls, x1, y1, x2, y2)"""
+        self.images += 1
+        for class_id in ground_truth[:, 0].astype(int):
+            self.ground_truth[class_id] += 1
+
+        matched = np.zeros(len(ground_truth), dtype=bool)
+        for detection in detections[np.argsort(-detections[:, 4])]:
+            class_id = int(detection[5])
+            if class_id >= self.num_classes:
+                continue
+            is_match = False
+            candidates = np.flatnonzero((ground_truth[:, 0] == class_id) & ~matched)
+            if len(candidates):
+                ious = box_iou(detection[:4], ground_truth[candidates, 1:5])
+                best = int(ious.argmax())
+                if ious[best] >= self.iou_threshold:
+                    matched[candidates[best]] = True
+                    is_match = True
+            self.scores[class_id].append(float(detection[4]))
+            self.matches[class_id].append(is_match)
+
+    def average_precision(self, class_id):
+        """AP por interpolación en todos los puntos (envolvente de precisión)"""
+        total = self.ground_truth[class_id]
+        if total == 0:
+            return None
+        if not self.scores[class_id]:
+            return 0.0
+        order = np.argsort(-np.array(self.scores[class_id]))
+        matches = np.array(self.matches[class_id])[order]
+        true_positives = np.cumsum(matches)
+        false_positives = np.cumsum(~matches)
+        recall = true_positives / total
+        precision = true_positives / np.maximum(true_positives + false_positives, 1e-9)
+
+        recall = np.concatenate([[0.0], recall, [1.0]])
+        precision = np.concatenate([[1.0], precision, [0.0]])
+        precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+        steps = np.flatnonzero(recall[1:] != recall[:-1])
+        return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+    def map50(self):
+        """(mAP50, {clase: AP}) sobre las clases con al menos una etiqueta"""
+        per_class = {}
+        for class_id in range(self.num_classes):
+            ap = self.average_precision(class_id)
+            if ap is not None:
+                per_class[class_id] = ap
+        mean = float(np.mean(list(per_class.values()))) if per_class else 0.0
+        return mean, per_class
+
+
+class ConfusionMatrix:
+    """Matriz de confusión de letras (filas: etiqueta real, columnas: predicción)"""
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self._index = {label: index for index, label in enumerate(self.labels)}
+        self.matrix = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+
+    def add(self, true_label, predicted_label):
+        self.matrix[self._index[true_label], self._index[predicted_label]] += 1
+
+    def accuracy(self):
+        total = self.matrix.sum()
+        return float(np.trace(self.matrix) / total) if total else 0.0
+
+    def per_class(self):
+        """{letra: precision, recall, support} de las letras que aparecen como etiqueta o predicción"""
+        true_positives = np.diag(self.matrix)
+        predicted = self.matrix.sum(axis=0)
+        actual = self.matrix.sum(axis=1)
+        return {
+            label: {
+                'precision': float(true_positives[index] / predicted[index]) if predicted[index] else 0.0,
+                'recall': float(true_positives[index] / actual[index]) if actual[index] else 0.0,
+                'support': int(actual[index]),
+            }
+            for index, label in enumerate(self.labels) if actual[index] or predicted[index]
+        }
+
+    def used_labels(self):
+        """Letras con alguna fila o columna no vacía (para imprimir una matriz compacta)"""
+        used = (self.matrix.sum(axis=0) + self.matrix.sum(axis=1)) > 0
+        return [label for label, is_used in zip(self.labels, used) if is_used]
+
+    def as_dict(self):
+        labels = self.used_labels()
+        indices = [self._index[label] for label in labels]
+        return {'labels': labels, 'matrix': self.matrix[np.ix_(indices, indices)].tolist()}
+
+
+class LatencyHistogram:
+    """Latencias en ms en cubetas fijas (límite superior incluido); guarda las muestras para percentiles"""
+
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.samples = []
+
+    def record(self, elapsed_ms):
+        self.counts[bisect.bisect_left(self.buckets, elapsed_ms)] += 1
+        self.samples.append(elapsed_ms)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        return float(np.percentile(self.samples, p * 100))
+
+    def bucket_labels(self):
+        return [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+
+    def as_dict(self):
+        return {
+            'count': len(self.samples),
+            'avg_ms': round(float(np.mean(self.samples)), 3) if self.samples else 0.0,
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            'max_ms': round(max(self.samples), 3) if self.samples else 0.0,
+            'buckets': dict(zip(self.bucket_labels(), self.counts)),
+        }
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+# Decimales de los landmarks normalizados en el JSON (0.0001 de un frame de 640 px < 0.1 px)
+LANDMARK_DECIMALS = 4
+
+
+def normalized_landmarks(points, frame_shape):
+    """Puntos Nx2 en píxeles -> [[x, y], ...] relativos al frame, redondeados para el JSON"""
+    height, width = frame_shape[:2]
+    return np.round(np.asarray(points, dtype=np.float64) / (width, height), LANDMARK_DECIMALS).tolist()
+
+
+def landmark_features(points):
+    """21 puntos (x, y) -> vector de 42 valores invariante a posición y escala.
+
+    Se toma la muñeca (punto 0) como origen y se divide por la distancia
+    máxima a ella, así no importa dónde ni a qué tamaño aparece la mano.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    points = points - points[0]
+    scale = np.linalg.norm(points, axis=1).max()
+    if scale > 0:
+        points = points / scale
+    return points.reshape(-1)
+
+
+class KNNLandmarkClassifier:
+    """k vecinos más cercanos sobre vectores de landmarks normalizados (solo NumPy).
+
+    predict() devuelve (clase, confianza) con la confianza como la fracción
+    del voto ponderado por 1/distancia que obtuvo la clase ganadora.
+    """
+
+    def __init__(self, features, labels, k=5):
+        self.features = np.asarray(features, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.k = min(k, len(self.labels))
+        self.num_classes = int(self.labels.max()) + 1 if len(self.labels) else 0
+        # ||a - b||² = ||a||² - 2ab + ||b||²: las normas del entrenamiento se calculan una vez
+        self._squared_norms = np.einsum('ij,ij->i', self.features, self.features)
+
+    def predict(self, points):
+        return self.predict_features(landmark_features(points))
+
+    def predict_features(self, vector):
+        distances = self._squared_norms - 2 * self.features @ vector + vector @ vector
+        nearest = np.argpartition(distances, self.k - 1)[:self.k]
+        weights = 1.0 / (np.sqrt(np.maximum(distances[nearest], 0)) + 1e-6)
+        votes = np.bincount(self.labels[nearest], weights=weights, minlength=self.num_classes)
+        class_id = int(votes.argmax())
+        return class_id, float(votes[class_id] / votes.sum())
+
+    def save(self, path):
+        np.savez_compressed(path, features=self.features, labels=self.labels, k=self.k)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['features'], data['labels'], k=int(data['k']))
@@ -0,0 +1,247 @@
+import itertools
+import json
+import os
+import platform
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from unittest import mock
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from detector.benchmark import FakeCamera, ResourceMonitor, compare_reports, load_frames, scenario_result
+from detector.evaluation import LatencyHistogram, find_datasets
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproducible con una cámara simulada (video, imágenes o dataset): process_frame, "
+        "bucle de la cámara, /detection-data/ y el MJPEG por configuración, con comparación contra "
+        "una línea base en JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source',
+                            help="Video, carpeta de imágenes, dataset o 'synthetic' (por defecto el primer dataset)")
+        parser.add_argument('--frames', type=int, default=100, help='Llamadas medidas a process_frame')
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help='Segundos con la cámara simulada encendida por configuración')
+        parser.add_argument('--camera-fps', type=float, default=30.0)
+        parser.add_argument('--http-rate', type=float, default=10.0,
+                            help='Peticiones por segundo a /detection-data/ (0 = no sondear)')
+        parser.add_argument('--mjpeg-viewers', type=int, default=1, help='Clientes leyendo /video-feed/')
+        parser.add_argument('--backend', nargs='*', help='Motores a comparar (por defecto DETECTOR_BACKEND)')
+        parser.add_argument('--imgsz', nargs='*', type=int, help='Tamaños de entrada a comparar')
+        parser.add_argument('--inference-fps', nargs='*', type=float, help='DETECTOR_INFERENCE_FPS a comparar')
+        parser.add_argument('--motion-gating', nargs='*', choices=['on', 'off'],
+                            help='Comparar con y sin DETECTOR_MOTION_GATING')
+        parser.add_argument('--output', help='Guardar el reporte en este archivo JSON')
+        parser.add_argument('--baseline', help='Reporte JSON anterior contra el que comparar')
+        parser.add_argument('--tolerance', type=float, default=0.10,
+                            help='Empeoramiento relativo máximo antes de fallar (0.10 = 10 %%)')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if source is None:
+            datasets = find_datasets(settings.BASE_DIR.parent)
+            source = datasets[0] if datasets else 'synthetic'
+        try:
+            self.frames = load_frames(source, getattr(settings, 'DETECTOR_CAPTURE_SIZE', (640, 480)))
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Fuente: {source} ({len(self.frames)} frames)")
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'options': {key: options[key] for key in (
+                'frames', 'duration', 'camera_fps', 'http_rate', 'mjpeg_viewers',
+            )},
+            'configurations': {},
+        }
+        for overrides in self.configurations(options):
+            with override_settings(**overrides):
+                name, results = self.run_configuration(options)
+            report['configurations'][name] = results
+            self.print_results(name, results)
+
+        if options['output']:
+            os.makedirs(os.path.dirname(options['output']) or '.', exist_ok=True)
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"✅ Reporte guardado en: {options['output']}"))
+
+        if baseline is not None:
+            self.check_baseline(report, baseline, options['tolerance'])
+
+    def configurations(self, options):
+        """Producto cartesiano de los valores pedidos, como overrides de settings"""
+        axes = [
+            ('DETECTOR_BACKEND', options['backend']),
+            ('DETECTOR_IMGSZ', options['imgsz']),
+            ('DETECTOR_INFERENCE_FPS', options['inference_fps']),
+            ('DETECTOR_MOTION_GATING', [value == 'on' for value in options['motion_gating'] or []]),
+        ]
+        axes = [(key, values) for key, values in axes if values]
+        for combination in itertools.product(*(values for _, values in axes)):
+            yield dict(zip((key for key, _ in axes), combination))
+
+    def run_configuration(self, options):
+        """Crear un detector con los settings actuales y correr los escenarios"""
+        from detector import detector_service, realtime, views
+        detector = detector_service.SignLanguageDetector()
+        name = (
+            f"backend={getattr(settings, 'DETECTOR_BACKEND', 'ultralytics')} imgsz={detector.backend.imgsz} "
+            f"fps={detector.inference_fps:g} motion={'on' if detector.motion_gate is not None else 'off'}"
+        )
+        self.stdout.write(f"\n=== {name} ===")
+
+        with ExitStack() as stack:
+            # Las vistas y el WebSocket usan la instancia global del módulo
+            for module in (detector_service, views, realtime):
+                stack.enter_context(mock.patch.object(module, 'detector', detector))
+            stack.enter_context(mock.patch.object(detector_service.detector_loader, '_instance', detector))
+            results = {'process_frame': self.bench_process_frame(detector, options['frames'])}
+            results.update(self.bench_camera(detector, options))
+        return name, results
+
+    def bench_process_frame(self, detector, count):
+        """YOLO + MediaPipe + codificación sobre frames sueltos, sin hilos de por medio"""
+        for frame_id, frame in enumerate(self.frames[:5]):
+            detector.process_frame(frame_id, frame)  # Calentamiento (no se mide)
+
+        latency = LatencyHistogram()
+        with ResourceMonitor() as monitor:
+            for frame_id in range(count):
+                frame = self.frames[frame_id % len(self.frames)]
+                started = time.perf_counter()
+                detector.process_frame(frame_id, frame)
+                latency.record((time.perf_counter() - started) * 1000)
+        return scenario_result(latency, count, monitor)
+
+    def bench_camera(self, detector, options):
+        """Cámara simulada encendida por /start/ con sondeo HTTP y espectadores MJPEG a la vez"""
+        camera = FakeCamera(self.frames, fps=options['camera_fps'])
+        camera_latency = LatencyHistogram()
+        published = []
+
+        def on_snapshot():
+            # start_detection hace una lectura de prueba: el frame_id N del grabber es la lectura N + 1
+            frame_id = detector.snapshot.frame_id
+            read_time = camera.read_time(frame_id + 1)
+            if read_time is not None and (not published or published[-1] != frame_id):
+                camera_latency.record((time.perf_counter() - read_time) * 1000)
+                published.append(frame_id)
+
+        client = Client(HTTP_HOST='localhost')
+        client.get('/')  # Crea la sesión del detector
+        stop = threading.Event()
+        http_latency, http_errors = LatencyHistogram(), []
+        mjpeg_latency, mjpeg_bytes = LatencyHistogram(), [0]
+
+        def poll_detection_data():
+            interval = 1.0 / options['http_rate']
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.get('/detection-data/')
+                http_latency.record((time.perf_counter() - started) * 1000)
+                if response.status_code != 200 or response.json().get('status') == 'error':
+                    http_errors.append(response.status_code)
+                stop.wait(max(0.0, interval - (time.perf_counter() - started)))
+
+        def watch_mjpeg():
+            response = Client(HTTP_HOST='localhost').get('/video-feed/')
+            last = time.perf_counter()
+            try:
+                for chunk in response.streaming_content:
+                    if stop.is_set():
+                        break
+                    if chunk.startswith(b'--frame'):
+                        now = time.perf_counter()
+                        mjpeg_latency.record((now - last) * 1000)  # Tiempo entre frames recibidos
+                        last = now
+                    mjpeg_bytes[0] += len(chunk)
+            finally:
+                response.close()
+
+        workers = []
+        if options['http_rate'] > 0:
+            workers.append(threading.Thread(target=poll_detection_data, name='benchmark-http', daemon=True))
+        for index in range(options['mjpeg_viewers']):
+            workers.append(threading.Thread(target=watch_mjpeg, name=f'benchmark-mjpeg-{index}', daemon=True))
+
+        detector.add_listener(on_snapshot)
+        with mock.patch.object(cv2, 'VideoCapture', lambda *args, **kwargs: camera):
+            response = client.post('/start/')
+            if response.json().get('status') != 'success':
+                raise CommandError(f"No se pudo iniciar la cámara simulada: {response.json().get('message')}")
+            time.sleep(1.0)  # Calentamiento: primeros frames fuera de la medición
+            camera_latency = LatencyHistogram()
+            published.clear()
+            first_read = camera.reads
+
+            with ResourceMonitor() as monitor:
+                for worker in workers:
+                    worker.start()
+                time.sleep(options['duration'])
+                stop.set()
+                reads = camera.reads - first_read
+                for worker in workers:
+                    worker.join(timeout=5.0)
+            client.post('/stop/')
+        detector.remove_listener(on_snapshot)
+
+        results = {
+            'camera': scenario_result(
+                camera_latency, len(published), monitor,
+                camera_frames=reads, published_ratio=round(len(published) / reads, 3) if reads else 0.0,
+            ),
+        }
+        if options['http_rate'] > 0:
+            results['http'] = scenario_result(http_latency, len(http_latency.samples), monitor,
+                                              errors=len(http_errors))
+        if options['mjpeg_viewers']:
+            results['mjpeg'] = scenario_result(mjpeg_latency, len(mjpeg_latency.samples), monitor,
+                                               megabytes=round(mjpeg_bytes[0] / 2 ** 20, 2))
+        return results
+
+    def print_results(self, name, results):
+        self.stdout.write(f"{'escenario':<14}{'cantidad':>9}{'por s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'CPU %':>8}{'RSS MB':>8}")
+        for scenario, result in results.items():
+            latency = result['latency']
+            self.stdout.write(
+                f"{scenario:<14}{result['count']:>9}{result['throughput']:>9.2f}{latency['p50_ms']:>9.2f}"
+                f"{latency['p95_ms']:>9.2f}{latency['p99_ms']:>9.2f}{result['cpu_percent']:>8.1f}"
+                f"{result['peak_rss_mb'] or 0:>8.1f}"
+            )
+
+    def check_baseline(self, report, baseline, tolerance):
+        rows, regressions = compare_reports(report, baseline, tolerance)
+        if not rows:
+            self.stdout.write(self.style.WARNING("⚠️ Ninguna configuración coincide con la línea base"))
+            return
+        self.stdout.write(f"\nComparación con la línea base ({baseline.get('created', '?')}):")
+        for row in rows:
+            config_name, scenario, metric, before, after, change = row
+            marker = '❌' if row in regressions else '  '
+            self.stdout.write(
+                f"{marker} {config_name} | {scenario:<13} {metric:<16} {before:>10.2f} -> {after:>10.2f} "
+                f"({change:+.1%})"
+            )
+        if regressions:
+            raise CommandError(f"❌ {len(regressions)} métricas empeoraron más de {tolerance:.0%}")
+        self.stdout.write(self.style.SUCCESS("✅ Sin regresiones respecto de la línea base"))
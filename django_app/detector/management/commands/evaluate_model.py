@@ -0,0 +1,219 @@
+import json
+import os
+import time
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.backends import CLASS_NAMES
+from detector.detector_service import ENGINE_LANDMARKS, detector
+from detector.evaluation import (
+    ConfusionMatrix, DetectionEvaluator, LatencyHistogram, class_map_for, find_datasets, iter_split,
+    stream_samples,
+)
+from detector.smoothing import NO_LETTER, TemporalSmoother
+
+
+STAGES = ('decode', 'landmarks', 'detect', 'validate', 'total')
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasar las imágenes de un split de los datasets por el detector de producción (YOLO en lotes "
+        "+ validación con MediaPipe) y reportar precisión/recall por letra, matriz de confusión, "
+        "mAP50 y latencias por etapa"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--datasets', nargs='*',
+                            help='Carpetas de datasets (por defecto todas las dataset* del proyecto)')
+        parser.add_argument('--split', default='test', choices=['train', 'valid', 'test'])
+        parser.add_argument('--engine', choices=['yolo', 'landmarks'],
+                            help='Motor a evaluar (por defecto DETECTOR_ENGINE)')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Procesos para decodificar imágenes (0 = en el mismo proceso)')
+        parser.add_argument('--batch-size', type=int, default=8, help='Imágenes por lote de inferencia')
+        parser.add_argument('--limit', type=int, default=None, help='Evaluar como máximo N imágenes')
+        parser.add_argument('--no-validation', action='store_true',
+                            help='No validar las cajas de YOLO con MediaPipe')
+        parser.add_argument('--smoothing', action='store_true',
+                            help='Pasar las predicciones por el suavizado temporal en orden de archivo '
+                                 '(solo tiene sentido si el split son frames consecutivos de un video)')
+        parser.add_argument('--json', dest='json_path', help='Guardar el reporte completo en este archivo JSON')
+
+    def handle(self, *args, **options):
+        datasets = options['datasets'] or find_datasets(settings.BASE_DIR.parent)
+        if not datasets:
+            raise CommandError("No se encontraron datasets")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size debe ser al menos 1")
+
+        self.detector = detector
+        self.engine = options['engine'] or detector.default_engine
+        if self.engine == ENGINE_LANDMARKS and detector.landmark_classifier is None:
+            raise CommandError("No hay clasificador de landmarks (ejecutar train_landmark_classifier)")
+        self.use_landmarks = self.engine == ENGINE_LANDMARKS
+        self.validate = not options['no_validation']
+
+        samples = [
+            (image_path, label_path, class_map_for(dataset, CLASS_NAMES))
+            for dataset in datasets for image_path, label_path in iter_split(dataset, options['split'])
+        ]
+        samples = samples[:options['limit']]
+        if not samples:
+            raise CommandError(f"No hay imágenes en {options['split']}/")
+        self.stdout.write(
+            f"Evaluando {len(samples)} imágenes de {options['split']}/ con el motor {self.engine} "
+            f"({options['workers']} procesos de decodificación, lotes de {options['batch_size']})..."
+        )
+
+        self.confusion = ConfusionMatrix(list(detector.class_names.values()) + [NO_LETTER])
+        self.evaluator = DetectionEvaluator(len(CLASS_NAMES))
+        self.latency = {stage: LatencyHistogram() for stage in STAGES}
+        self.smoother = None
+        if options['smoothing']:
+            self.smoother = TemporalSmoother(
+                window=getattr(settings, 'DETECTOR_SMOOTHING_WINDOW', 7),
+                decay=getattr(settings, 'DETECTOR_SMOOTHING_DECAY', 1.0),
+            )
+        unreadable = 0
+
+        started = time.perf_counter()
+        batch = []
+        prefetch = max(options['batch_size'] * 4, options['workers'] * 2)
+        for image_path, frame, ground_truth, decode_ms in stream_samples(samples, options['workers'], prefetch):
+            if frame is None:
+                unreadable += 1
+                continue
+            self.latency['decode'].record(decode_ms)
+            batch.append((frame, ground_truth))
+            if len(batch) >= options['batch_size']:
+                self.evaluate_batch(batch)
+                batch = []
+        if batch:
+            self.evaluate_batch(batch)
+        elapsed = time.perf_counter() - started
+
+        report = self.build_report(options, len(samples) - unreadable, unreadable, elapsed)
+        self.print_report(report)
+        if options['json_path']:
+            os.makedirs(os.path.dirname(options['json_path']) or '.', exist_ok=True)
+            with open(options['json_path'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"✅ Reporte guardado en: {options['json_path']}"))
+
+    def evaluate_batch(self, batch):
+        """Mismo camino que process_batch (sin recorte del tracker: las imágenes no son consecutivas)"""
+        detector = self.detector
+        predictions = [None] * len(batch)  # (letra, confianza %)
+        elapsed = [0.0] * len(batch)
+
+        pending = list(range(len(batch)))
+        if self.use_landmarks:
+            pending = []
+            for index, (frame, _) in enumerate(batch):
+                # El clasificador se entrenó con el espejo que aplica el detector a la cámara
+                started = time.perf_counter()
+                snapshot, _ = detector.classify_landmarks(index, cv2.flip(frame, 1), None, render=False)
+                landmarks_ms = (time.perf_counter() - started) * 1000
+                self.latency['landmarks'].record(landmarks_ms)
+                elapsed[index] += landmarks_ms
+                if snapshot is None:
+                    pending.append(index)
+                else:
+                    predictions[index] = (snapshot.letter, snapshot.confidence)
+
+        if pending:
+            frames = [batch[index][0] for index in pending]
+            started = time.perf_counter()
+            results = detector.detect(frames)
+            detect_ms = (time.perf_counter() - started) * 1000 / len(frames)
+            for index, detections in zip(pending, results):
+                self.latency['detect'].record(detect_ms)
+                self.evaluator.add(detections, batch[index][1])
+
+                started = time.perf_counter()
+                if self.validate:
+                    snapshot = detector.analyze(index, batch[index][0], detections, render=False)
+                    predictions[index] = (snapshot.letter, snapshot.confidence)
+                else:
+                    predictions[index] = self.best_detection(detections)
+                validate_ms = (time.perf_counter() - started) * 1000
+                self.latency['validate'].record(validate_ms)
+                elapsed[index] += detect_ms + validate_ms
+
+        for (_, ground_truth), (letter, confidence), total_ms in zip(batch, predictions, elapsed):
+            self.latency['total'].record(total_ms)
+            if self.smoother is not None:
+                letter = self.smoother.update(letter, confidence)
+            # Una imagen sin etiquetas de letras conocidas debería dar NINGUNA
+            expected = detector.class_names[int(ground_truth[0, 0])] if len(ground_truth) else NO_LETTER
+            self.confusion.add(expected, letter)
+
+    def best_detection(self, detections):
+        """(letra, confianza %) de la mejor caja de YOLO tal cual (sin MediaPipe)"""
+        if not len(detections):
+            return NO_LETTER, 0
+        best_box = detections[int(detections[:, 4].argmax())]
+        return self.detector.class_names.get(int(best_box[5]), "?"), int(best_box[4] * 100)
+
+    def build_report(self, options, images, unreadable, elapsed):
+        mean_ap, per_class_ap = self.evaluator.map50()
+        per_class = self.confusion.per_class()
+        for class_id, ap in per_class_ap.items():
+            letter = self.detector.class_names[class_id]
+            if letter in per_class:
+                per_class[letter]['ap50'] = ap
+        return {
+            'split': options['split'],
+            'engine': self.engine,
+            'validation': self.validate,
+            'smoothing': self.smoother is not None,
+            'model': str(self.detector.backend.model_path),
+            'images': images,
+            'unreadable': unreadable,
+            'elapsed_s': round(elapsed, 2),
+            'images_per_s': round(images / elapsed, 2) if elapsed else 0.0,
+            'accuracy': self.confusion.accuracy(),
+            'map50': mean_ap,
+            'per_class': per_class,
+            'confusion_matrix': self.confusion.as_dict(),
+            'latency': {stage: histogram.as_dict() for stage, histogram in self.latency.items()
+                        if histogram.samples},
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"\n{report['images']} imágenes en {report['elapsed_s']} s ({report['images_per_s']} img/s); "
+            f"{report['unreadable']} ilegibles"
+        )
+        self.stdout.write(f"Exactitud de letra: {report['accuracy']:.4f}   mAP50 (YOLO crudo): {report['map50']:.4f}")
+
+        self.stdout.write("\nLetra     Precisión  Recall  Soporte  AP50")
+        for letter, metrics in report['per_class'].items():
+            ap = f"{metrics['ap50']:.3f}" if 'ap50' in metrics else '  -  '
+            self.stdout.write(
+                f"{letter:<9} {metrics['precision']:>9.3f}  {metrics['recall']:>6.3f}  "
+                f"{metrics['support']:>7}  {ap}"
+            )
+
+        # Matriz compacta: solo letras que aparecen como etiqueta o predicción
+        labels = report['confusion_matrix']['labels']
+        width = max(max(len(label) for label in labels), 4) + 1
+        self.stdout.write("\nMatriz de confusión (filas: real, columnas: predicción)")
+        self.stdout.write(' ' * width + ''.join(f"{label[:width - 1]:>{width}}" for label in labels))
+        for label, row in zip(labels, report['confusion_matrix']['matrix']):
+            self.stdout.write(f"{label:<{width}}" + ''.join(f"{count:>{width}}" for count in row))
+
+        self.stdout.write("\nLatencias por etapa (ms por imagen)")
+        for stage, histogram in report['latency'].items():
+            self.stdout.write(
+                f"{stage:<9} avg={histogram['avg_ms']:.2f}  p50={histogram['p50_ms']:.2f}  "
+                f"p95={histogram['p95_ms']:.2f}  p99={histogram['p99_ms']:.2f}  max={histogram['max_ms']:.2f}"
+            )
+            peak = max(histogram['buckets'].values()) or 1
+            for bucket, count in histogram['buckets'].items():
+                if count:
+                    bar = '#' * max(1, int(40 * count / peak))
+                    self.stdout.write(f"    {bucket:>7} {count:>6} {bar}")
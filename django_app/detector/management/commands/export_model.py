@@ -0,0 +1,59 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Exportar los pesos YOLO entrenados a ONNX y/u OpenVINO IR (FP32, FP16 o INT8)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weights', default=settings.MODEL_PATH,
+                            help='Pesos .pt de origen (por defecto MODEL_PATH)')
+        parser.add_argument('--format', dest='formats', action='append', choices=['onnx', 'openvino'],
+                            help='Formato de salida; se puede repetir (por defecto onnx)')
+        parser.add_argument('--imgsz', type=int, default=None,
+                            help='Tamaño de entrada del grafo (por defecto el de entrenamiento)')
+        parser.add_argument('--half', action='store_true', help='Pesos FP16')
+        parser.add_argument('--int8', action='store_true',
+                            help='Cuantización INT8 (solo OpenVINO; para ONNX usar quantize_model)')
+        parser.add_argument('--data', default=os.path.join(settings.BASE_DIR.parent, 'dataset2', 'data.yaml'),
+                            help='data.yaml usado para calibrar INT8')
+        parser.add_argument('--dynamic', action='store_true',
+                            help='Ejes dinámicos (lote y tamaño de entrada variables)')
+
+    def handle(self, *args, **options):
+        weights = options['weights']
+        formats = options['formats'] or ['onnx']
+        if not os.path.exists(weights):
+            raise CommandError(f"No se encontró el modelo en: {weights}")
+        if options['int8'] and 'onnx' in formats:
+            raise CommandError("INT8 para ONNX se genera con: python manage.py quantize_model")
+
+        from ultralytics import YOLO
+
+        for fmt in formats:
+            self.stdout.write(f"Exportando {weights} a {fmt}...")
+            export_options = {
+                'format': fmt,
+                'imgsz': options['imgsz'],
+                'half': options['half'],
+                'dynamic': options['dynamic'],
+            }
+            if fmt == 'onnx':
+                export_options['simplify'] = True
+            if options['int8']:
+                export_options['int8'] = True
+                export_options['data'] = options['data']
+
+            # YOLO se recarga en cada formato porque export modifica el modelo en memoria
+            model = YOLO(weights)
+            if export_options['imgsz'] is None:
+                train_args = (getattr(model, 'ckpt', None) or {}).get('train_args') or {}
+                export_options['imgsz'] = train_args.get('imgsz', 640)
+            output = model.export(**export_options)
+            self.stdout.write(self.style.SUCCESS(f"✅ {fmt}: {output}"))
+
+        self.stdout.write(
+            "Para usarlo, configurar DETECTOR_BACKEND ('onnxruntime' u 'openvino') en settings.py"
+        )
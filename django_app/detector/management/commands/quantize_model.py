@@ -0,0 +1,122 @@
+import os
+import random
+import time
+
+import cv2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.backends import CLASS_NAMES, OnnxRuntimeBackend, default_model_path
+from detector.evaluation import (
+    DetectionEvaluator, class_map_for, find_datasets, iter_split, read_labels,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Cuantizar el modelo ONNX a INT8 calibrando con imágenes de valid/ y publicarlo "
+        "solo si el mAP50 en test/ no cae más que el umbral"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=default_model_path('onnxruntime', settings.MODEL_PATH),
+                            help='Modelo ONNX FP32 (generado con export_model)')
+        parser.add_argument('--output', help='Ruta del modelo INT8 (por defecto <modelo>_int8.onnx)')
+        parser.add_argument('--datasets', nargs='*',
+                            help='Carpetas de datasets (por defecto todas las dataset* del proyecto)')
+        parser.add_argument('--calibration-images', type=int, default=300,
+                            help='Imágenes de valid/ usadas para calibrar')
+        parser.add_argument('--max-drop', type=float, default=0.01,
+                            help='Caída máxima permitida de mAP50 (absoluta, 0.01 = 1 punto)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--num-threads', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            from onnxruntime.quantization import (
+                CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static,
+            )
+        except ImportError:
+            raise CommandError("Se requiere onnxruntime: pip install onnxruntime")
+
+        model_path = options['model']
+        if not os.path.exists(model_path):
+            raise CommandError(f"No se encontró el modelo en: {model_path} (ejecutar export_model)")
+        output_path = options['output'] or os.path.splitext(model_path)[0] + '_int8.onnx'
+        candidate_path = os.path.splitext(output_path)[0] + '.candidate.onnx'
+
+        datasets = options['datasets'] or find_datasets(settings.BASE_DIR.parent)
+        if not datasets:
+            raise CommandError("No se encontraron datasets para calibrar")
+
+        fp32 = OnnxRuntimeBackend(model_path, conf=0.001, num_threads=options['num_threads'])
+
+        # Muestra representativa de valid/ de todos los datasets
+        calibration = [image for dataset in datasets for image, _ in iter_split(dataset, 'valid')]
+        random.Random(options['seed']).shuffle(calibration)
+        calibration = calibration[:options['calibration_images']]
+        self.stdout.write(f"Calibrando con {len(calibration)} imágenes de {len(datasets)} datasets...")
+
+        class ValidSplitReader(CalibrationDataReader):
+            def __init__(self):
+                self.images = iter(calibration)
+
+            def get_next(self):
+                for path in self.images:
+                    frame = cv2.imread(path)
+                    if frame is not None:
+                        batch, _ = fp32.preprocess([frame])
+                        return {fp32.input_name: batch}
+                return None
+
+        quantize_static(
+            model_path, candidate_path, ValidSplitReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+
+        int8 = OnnxRuntimeBackend(candidate_path, conf=0.001, num_threads=options['num_threads'])
+        test_set = [
+            (image, label, class_map_for(dataset, CLASS_NAMES))
+            for dataset in datasets for image, label in iter_split(dataset, 'test')
+        ]
+        self.stdout.write(f"Evaluando en {len(test_set)} imágenes de test/...")
+        fp32_map, fp32_latency = self.evaluate(fp32, test_set)
+        int8_map, int8_latency = self.evaluate(int8, test_set)
+
+        drop = fp32_map - int8_map
+        self.stdout.write(f"FP32: mAP50={fp32_map:.4f}  latencia={fp32_latency:.1f} ms/imagen")
+        self.stdout.write(f"INT8: mAP50={int8_map:.4f}  latencia={int8_latency:.1f} ms/imagen")
+        self.stdout.write(f"Caída de mAP50: {drop:.4f}  Aceleración: {fp32_latency / int8_latency:.2f}x")
+
+        if drop > options['max_drop']:
+            os.remove(candidate_path)
+            raise CommandError(
+                f"❌ La caída de mAP50 ({drop:.4f}) supera el máximo ({options['max_drop']}); "
+                "no se publica el modelo INT8"
+            )
+
+        os.replace(candidate_path, output_path)
+        self.stdout.write(self.style.SUCCESS(f"✅ Modelo INT8 publicado en: {output_path}"))
+        self.stdout.write(
+            "Para usarlo: DETECTOR_BACKEND = 'onnxruntime' y DETECTOR_BACKEND_MODEL_PATH apuntando a ese archivo"
+        )
+
+    def evaluate(self, backend, test_set):
+        """(mAP50, latencia media en ms) del motor sobre el split de test"""
+        evaluator = DetectionEvaluator(len(CLASS_NAMES))
+        elapsed = 0.0
+        for image_path, label_path, class_map in test_set:
+            frame = cv2.imread(image_path)
+            if frame is None:
+                continue
+            started = time.perf_counter()
+            detections = backend.predict([frame])[0]
+            elapsed += time.perf_counter() - started
+            height, width = frame.shape[:2]
+            evaluator.add(detections, read_labels(label_path, width, height, class_map))
+        mean, _ = evaluator.map50()
+        return mean, (elapsed / max(evaluator.images, 1)) * 1000
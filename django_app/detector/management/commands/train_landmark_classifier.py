@@ -0,0 +1,105 @@
+import os
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.backends import CLASS_NAMES
+from detector.evaluation import class_map_for, find_datasets, iter_split, read_labels
+from detector.landmarks import KNNLandmarkClassifier, landmark_features
+
+
+class Command(BaseCommand):
+    help = (
+        "Extraer landmarks de MediaPipe de las imágenes train/ de los datasets (con caché en disco) "
+        "y entrenar el clasificador k-NN de letras por landmarks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--datasets', nargs='*',
+                            help='Carpetas de datasets (por defecto todas las dataset* del proyecto)')
+        parser.add_argument('--output', default=getattr(settings, 'DETECTOR_LANDMARK_MODEL_PATH', None),
+                            help='Archivo .npz del clasificador')
+        parser.add_argument('--cache-dir', default=os.path.join(settings.BASE_DIR, '.landmark_cache'),
+                            help='Carpeta de la caché de landmarks por dataset y split')
+        parser.add_argument('--refresh', action='store_true', help='Ignorar la caché y volver a extraer')
+        parser.add_argument('--k', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError("Indicar --output o DETECTOR_LANDMARK_MODEL_PATH en settings")
+        datasets = options['datasets'] or find_datasets(settings.BASE_DIR.parent)
+        if not datasets:
+            raise CommandError("No se encontraron datasets")
+        os.makedirs(options['cache_dir'], exist_ok=True)
+
+        hands = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=1, min_detection_confidence=0.5)
+        try:
+            train = [self.load_split(hands, dataset, 'train', options) for dataset in datasets]
+            valid = [self.load_split(hands, dataset, 'valid', options) for dataset in datasets]
+        finally:
+            hands.close()
+
+        features = np.concatenate([x for x, _ in train])
+        labels = np.concatenate([y for _, y in train])
+        if not len(labels):
+            raise CommandError("MediaPipe no encontró manos en las imágenes de entrenamiento")
+
+        classifier = KNNLandmarkClassifier(features, labels, k=options['k'])
+        self.stdout.write(f"Entrenado con {len(labels)} muestras de {len(np.unique(labels))} letras")
+
+        valid_features = np.concatenate([x for x, _ in valid])
+        valid_labels = np.concatenate([y for _, y in valid])
+        if len(valid_labels):
+            predictions = np.array([classifier.predict_features(vector)[0] for vector in valid_features])
+            accuracy = float((predictions == valid_labels).mean())
+            self.stdout.write(f"Precisión en valid/: {accuracy:.3f} ({len(valid_labels)} muestras)")
+
+        os.makedirs(os.path.dirname(options['output']) or '.', exist_ok=True)
+        classifier.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Clasificador guardado en: {options['output']}"))
+
+    def load_split(self, hands, dataset, split, options):
+        """(features Nx42, labels N) de un split, leídos de la caché si existe"""
+        cache_path = os.path.join(options['cache_dir'], f"{os.path.basename(dataset)}_{split}.npz")
+        if os.path.exists(cache_path) and not options['refresh']:
+            cached = np.load(cache_path)
+            self.stdout.write(f"{os.path.basename(dataset)}/{split}: {len(cached['labels'])} muestras (caché)")
+            return cached['features'], cached['labels']
+
+        class_map = class_map_for(dataset, CLASS_NAMES)
+        features, labels = [], []
+        images = skipped = 0
+        for image_path, label_path in iter_split(dataset, split):
+            frame = cv2.imread(image_path)
+            if frame is None:
+                continue
+            images += 1
+            height, width = frame.shape[:2]
+            ground_truth = read_labels(label_path, width, height, class_map)
+            if not len(ground_truth):
+                skipped += 1
+                continue
+
+            # Mismo espejo que aplica el detector a los frames de la cámara
+            frame = cv2.flip(frame, 1)
+            result = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if not result.multi_hand_landmarks:
+                skipped += 1
+                continue
+            landmarks = result.multi_hand_landmarks[0].landmark
+            points = np.array([(landmark.x * width, landmark.y * height) for landmark in landmarks],
+                              dtype=np.float32)
+            features.append(landmark_features(points))
+            labels.append(int(ground_truth[0, 0]))
+
+        features = np.array(features, dtype=np.float32).reshape(-1, 42)
+        labels = np.array(labels, dtype=np.int64)
+        np.savez_compressed(cache_path, features=features, labels=labels)
+        self.stdout.write(
+            f"{os.path.basename(dataset)}/{split}: {len(labels)} muestras de {images} imágenes "
+            f"({skipped} sin mano o sin etiqueta)"
+        )
+        return features, labels
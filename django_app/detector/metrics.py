@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+
+# Límites de las cubetas en segundos (convención de Prometheus)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class StageTimer:
+    """Duraciones de una etapa: histograma acumulado (Prometheus) y ventana móvil (percentiles)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=500):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self._count += 1
+            self._recent.append(seconds)
+
+    def histogram(self):
+        """(conteos acumulados por límite incluyendo +Inf, suma, cantidad)"""
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            count = self._count
+
+        def percentile(p):
+            if not recent:
+                return 0
+            return round(recent[min(int(len(recent) * p), len(recent) - 1)] * 1000, 3)
+
+        return {
+            'count': count,
+            'avg_ms': round(sum(recent) / len(recent) * 1000, 3) if recent else 0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(recent[-1] * 1000, 3) if recent else 0,
+        }
+
+
+class _Span:
+    """Mide el bloque with y lo registra en el StageTimer (sin generadores: es el camino caliente)"""
+
+    __slots__ = ('timer', 'started')
+
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.record(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    """Temporizadores por etapa y contadores de eventos del detector"""
+
+    def __init__(self, window=500, buckets=DEFAULT_BUCKETS):
+        self.window = window
+        self.buckets = buckets
+        self._timers = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        timer = self._timers.get(stage)
+        if timer is None:
+            with self._lock:
+                timer = self._timers.setdefault(stage, StageTimer(self.buckets, self.window))
+        return timer
+
+    def span(self, stage):
+        """with metrics.span('yolo'): ... registra la duración del bloque"""
+        return _Span(self.timer(stage))
+
+    def observe(self, stage, seconds):
+        self.timer(stage).record(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def timers(self):
+        with self._lock:
+            return dict(self._timers)
+
+    def stage_stats(self):
+        return {stage: timer.stats() for stage, timer in sorted(self.timers().items())}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render_prometheus(registry, samples, prefix='detector'):
+    """Formato de texto de Prometheus: histograma por etapa + muestras (nombre, tipo, ayuda, etiquetas, valor).
+
+    registry puede ser None (solo se escriben las muestras).
+    """
+    lines = []
+    timers = sorted(registry.timers().items()) if registry is not None else []
+    if timers:
+        lines.append(f'# HELP {prefix}_stage_seconds Duración de cada etapa del procesamiento de frames')
+        lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+    for stage, timer in timers:
+        cumulative, total, count = timer.histogram()
+        for bound, value in zip([*timer.buckets, '+Inf'], cumulative):
+            labels = _format_labels({'stage': stage, 'le': bound})
+            lines.append(f'{prefix}_stage_seconds_bucket{labels} {value}')
+        labels = _format_labels({'stage': stage})
+        lines.append(f'{prefix}_stage_seconds_sum{labels} {total:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{labels} {count}')
+
+    # Las muestras de una misma métrica van juntas bajo un solo HELP/TYPE
+    grouped = {}
+    for name, kind, help_text, labels, value in samples:
+        grouped.setdefault((name, kind, help_text), []).append((labels, value))
+    for (name, kind, help_text), values in grouped.items():
+        lines.append(f'# HELP {prefix}_{name} {help_text}')
+        lines.append(f'# TYPE {prefix}_{name} {kind}')
+        for labels, value in values:
+            lines.append(f'{prefix}_{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
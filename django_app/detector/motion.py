@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decide si un frame cambió lo suficiente como para volver a ejecutar la inferencia.
+
+    Compara una miniatura en escala de grises con la del último frame procesado
+    (no con el anterior, para que un movimiento lento también se acumule). Si
+    la diferencia media no llega a threshold se reutiliza el último resultado;
+    como máximo se saltan max_skip frames seguidos.
+    """
+
+    def __init__(self, threshold=4.0, max_skip=15, size=(64, 48)):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.size = size
+        self._reference = None
+        self._skipped_in_row = 0
+
+        # Métricas
+        self.processed = 0
+        self.skipped = 0
+        self.last_difference = 0.0
+
+    def should_process(self, frame):
+        thumbnail = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if self._reference is not None and self._skipped_in_row < self.max_skip:
+            self.last_difference = float(np.abs(thumbnail.astype(np.int16) - self._reference).mean())
+            if self.last_difference < self.threshold:
+                self._skipped_in_row += 1
+                self.skipped += 1
+                return False
+
+        self._reference = thumbnail.astype(np.int16)
+        self._skipped_in_row = 0
+        self.processed += 1
+        return True
+
+    def reset(self):
+        self._reference = None
+        self._skipped_in_row = 0
+
+    def stats(self):
+        total = self.processed + self.skipped
+        return {
+            'processed': self.processed,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skipped / total, 3) if total else 0,
+            'last_difference': round(self.last_difference, 2),
+            'threshold': self.threshold,
+        }
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+
+# Colores BGR y estilos fijos (se crean una sola vez, no en cada frame)
+BOX_COLOR = (0, 255, 0)
+LANDMARK_COLOR = (0, 0, 255)
+CONNECTION_COLOR = (0, 255, 0)
+BANNER_COLOR = (255, 255, 255)
+TRAINING_COLOR = (255, 255, 0)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def confidence_color(confidence_percent):
+    """Verde, amarillo o naranja según la confianza"""
+    if confidence_percent >= 70:
+        return (0, 255, 0)
+    if confidence_percent >= 50:
+        return (0, 255, 255)
+    return (0, 165, 255)
+
+
+class OverlayRenderer:
+    """Dibuja caja, landmarks y textos de una detección sobre una copia del frame.
+
+    Solo se usa para el MJPEG (o si DETECTOR_CLIENT_OVERLAY está desactivado);
+    la página web recibe estos datos en JSON y los dibuja en un canvas.
+    """
+
+    def __init__(self, connections):
+        self.connections = np.array(sorted(connections), dtype=np.int32).reshape(-1, 2)
+
+    def draw(self, image, letter, confidence_percent, box, landmarks, training=None):
+        """training: estado del entrenamiento de la sesión (as_status) o None"""
+        output = image.copy()
+        if box is not None:
+            x1, y1, x2, y2 = box
+            cv2.rectangle(output, (x1, y1), (x2, y2), BOX_COLOR, 3)
+
+            if landmarks:
+                height, width = output.shape[:2]
+                points = (np.asarray(landmarks, dtype=np.float32) * (width, height)).astype(np.int32)
+                for start, end in self.connections:
+                    cv2.line(output, tuple(points[start]), tuple(points[end]), CONNECTION_COLOR, 2)
+                for point in points:
+                    cv2.circle(output, tuple(point), 2, LANDMARK_COLOR, 2)
+
+            cv2.putText(output, f"{letter} ({confidence_percent}%)", (x1, y1 - 15),
+                        FONT, 1.5, confidence_color(confidence_percent), 4)
+
+        # Información general
+        cv2.putText(output, "DETECTOR DE LENGUAJE DE SEÑAS", (10, 35), FONT, 1.2, BANNER_COLOR, 3)
+        cv2.putText(output, f"LETRA: {letter}", (10, 80), FONT, 1.1, BANNER_COLOR, 3)
+        cv2.putText(output, f"CONFIANZA: {confidence_percent}%", (10, 120), FONT, 1.1, BANNER_COLOR, 3)
+
+        # Información de entrenamiento en pantalla
+        if training and training.get('target_letter'):
+            cv2.putText(output, f"OBJETIVO: {training['target_letter']}", (10, 150), FONT, 1.5, TRAINING_COLOR, 3)
+            cv2.putText(output, f"ACIERTOS: {training['correct_detections']}/{training['total_attempts']}",
+                        (10, 190), FONT, 1, BANNER_COLOR, 2)
+        return output
@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+_STOP = object()
+
+
+class StageMetrics:
+    """Latencias recientes de una etapa (ms) y contadores"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def record(self, elapsed_ms, passed):
+        with self._lock:
+            self._latencies.append(elapsed_ms)
+            self.processed += 1
+            if not passed:
+                self.dropped += 1
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            processed, dropped, errors = self.processed, self.dropped, self.errors
+
+        def percentile(p):
+            if not latencies:
+                return 0
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 2)
+
+        return {
+            'processed': processed,
+            'dropped': dropped,
+            'errors': errors,
+            'avg_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+        }
+
+
+class Pipeline:
+    """Etapas en hilos propios unidas por colas acotadas.
+
+    Cada etapa recibe el resultado de la anterior y devuelve el de la siguiente
+    (None descarta el elemento). Mientras una etapa procesa el frame N, la
+    anterior ya trabaja en el N+1, así que el rendimiento queda limitado por la
+    etapa más lenta y no por la suma de todas. OpenCV, YOLO y MediaPipe liberan
+    el GIL durante el cálculo pesado.
+    """
+
+    def __init__(self, stages, queue_size=1, name='detector-pipeline'):
+        self.stages = list(stages)
+        self.name = name
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self.metrics = {stage_name: StageMetrics() for stage_name, _ in self.stages}
+        self._threads = []
+
+    def start(self):
+        for index, (stage_name, _) in enumerate(self.stages):
+            thread = threading.Thread(
+                target=self._run, args=(index,), name=f'{self.name}-{stage_name}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, item, timeout=None):
+        """Encolar en la primera etapa (bloquea si está ocupada); False si se agotó la espera"""
+        try:
+            self.queues[0].put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self, timeout=2.0):
+        """Terminar las etapas después de procesar lo que ya estaba encolado"""
+        if self._threads:
+            self.queues[0].put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self, index):
+        stage_name, function = self.stages[index]
+        metrics = self.metrics[stage_name]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                if outbox is not None:
+                    outbox.put(_STOP)
+                return
+
+            started = time.perf_counter()
+            try:
+                result = function(item)
+            except Exception as e:
+                metrics.error()
+                print(f"Error en la etapa {stage_name}: {e}")
+                continue
+            # La última etapa no devuelve nada: solo cuenta como descarte en las intermedias
+            metrics.record((time.perf_counter() - started) * 1000, result is not None or outbox is None)
+
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+    def stats(self):
+        return {
+            stage_name: dict(self.metrics[stage_name].stats(), queue_depth=self.queues[index].qsize())
+            for index, (stage_name, _) in enumerate(self.stages)
+        }
@@ -0,0 +1,186 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Muestrea las pilas de los hilos del detector cada interval segundos.
+
+    No instrumenta el código: un hilo aparte lee sys._current_frames(), así
+    que el costo no depende de cuántas funciones se llamen. Las pilas se
+    agregan por función (no por línea) para que el flame graph quede legible.
+    """
+
+    def __init__(self, interval=0.005, thread_prefix='detector'):
+        self.interval = interval
+        self.thread_prefix = thread_prefix
+        self.samples = Counter()  # (hilo, pila) -> cantidad de muestras
+        self.ticks = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident)
+                if ident == own or name is None or not name.startswith(self.thread_prefix):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(name, tuple(stack))] += 1
+            self.ticks += 1
+
+    def collapsed(self):
+        """Formato 'hilo;func;func cantidad' (flamegraph.pl, speedscope, inferno)"""
+        return ''.join(
+            f"{';'.join((thread_name,) + stack)} {count}\n"
+            for (thread_name, stack), count in sorted(self.samples.items())
+        )
+
+    def speedscope(self, name='detector'):
+        """Archivo de speedscope.app: un perfil muestreado por hilo, en segundos"""
+        frames, frame_index = [], {}
+        profiles = {}
+        for (thread_name, stack), count in sorted(self.samples.items()):
+            indices = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({'name': label})
+                indices.append(frame_index[label])
+            profile = profiles.setdefault(thread_name, {
+                'type': 'sampled', 'name': thread_name, 'unit': 'seconds',
+                'startValue': 0, 'endValue': 0, 'samples': [], 'weights': [],
+            })
+            profile['samples'].append(indices)
+            profile['weights'].append(count * self.interval)
+            profile['endValue'] += count * self.interval
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'detector.profiling',
+            'shared': {'frames': frames},
+            'profiles': list(profiles.values()),
+        }
+
+
+class AllocationTracker:
+    """Diferencia de tracemalloc entre el inicio y el fin de la ventana, por línea de código.
+
+    Muestra lo que quedó asignado (crecimiento neto) y el pico de memoria
+    trazada; lo que se asigna y libera dentro de la ventana solo se ve en el pico.
+    """
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._started_tracing = False
+        self._before = None
+        self.peak = 0
+
+    def start(self):
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+
+    def stop(self, frames_processed, limit=25):
+        """[{ubicación, KB, asignaciones, asignaciones por frame}] de las líneas que más crecieron"""
+        after = tracemalloc.take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if self._started_tracing:
+            tracemalloc.stop()
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ]
+        differences = after.filter_traces(filters).compare_to(self._before.filter_traces(filters), 'lineno')
+        differences.sort(key=lambda stat: abs(stat.count_diff), reverse=True)
+        return [
+            {
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_kb': round(stat.size_diff / 1024, 1),
+                'count': stat.count_diff,
+                'count_per_frame': round(stat.count_diff / frames_processed, 2) if frames_processed else None,
+            }
+            for stat in differences[:limit] if stat.count_diff or stat.size_diff
+        ]
+
+
+_profile_lock = threading.Lock()
+
+
+def profile_detector(detector, seconds, output_dir, output_format='speedscope', allocations=True,
+                     interval=0.005, thread_prefix='detector'):
+    """Perfilar los hilos del detector durante seconds y guardar el resultado en output_dir.
+
+    Devuelve un resumen con las rutas escritas; None si ya hay un perfilado en curso.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(interval=interval, thread_prefix=thread_prefix)
+        tracker = AllocationTracker() if allocations else None
+        first_frame = detector.frames_processed()
+
+        if tracker is not None:
+            tracker.start()
+        profiler.start()
+        time.sleep(seconds)
+        profiler.stop()
+        frames_processed = detector.frames_processed() - first_frame
+        top_allocations = tracker.stop(frames_processed) if tracker is not None else None
+
+        os.makedirs(output_dir, exist_ok=True)
+        stem = os.path.join(output_dir, time.strftime('profile-%Y%m%d-%H%M%S'))
+        if output_format == 'collapsed':
+            profile_path = stem + '.collapsed.txt'
+            with open(profile_path, 'w', encoding='utf-8') as f:
+                f.write(profiler.collapsed())
+        else:
+            profile_path = stem + '.speedscope.json'
+            with open(profile_path, 'w', encoding='utf-8') as f:
+                json.dump(profiler.speedscope(), f)
+
+        summary = {
+            'profile': profile_path,
+            'seconds': round(profiler.elapsed, 2),
+            'samples': sum(profiler.samples.values()),
+            'ticks': profiler.ticks,
+            'threads': sorted({thread_name for thread_name, _ in profiler.samples}),
+            'frames': frames_processed,
+        }
+        if top_allocations is not None:
+            summary['allocations'] = stem + '.allocations.json'
+            summary['traced_peak_mb'] = round(tracker.peak / 2 ** 20, 1)
+            with open(summary['allocations'], 'w', encoding='utf-8') as f:
+                json.dump({'frames': frames_processed, 'traced_peak_mb': summary['traced_peak_mb'],
+                           'top': top_allocations}, f, indent=2)
+            summary['top_allocations'] = top_allocations[:10]
+        return summary
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http.request import validate_host
+
+from .detector_service import SOURCE_CAMERA, detector, detector_loader
+
+
+class DetectionSocket:
+    """WebSocket ASGI que empuja los resultados de la sesión solo cuando cambian.
+
+    Mensajes de texto: JSON con los metadatos de /detection-data/ (letra,
+    confianza, caja, landmarks, entrenamiento), enviados solo si cambiaron, más
+    'events' con las letras confirmadas nuevas (?after=<event_id> al reconectar).
+    Mensajes binarios: el JPEG de cada frame nuevo (se desactiva con ?video=0).
+    No usa Django Channels: un hilo no queda ocupado por cada cliente en espera.
+    """
+
+    def __init__(self, keepalive=None):
+        self.keepalive = keepalive or getattr(settings, 'DETECTOR_PUSH_KEEPALIVE', 25)
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        if message['type'] != 'websocket.connect':
+            return
+
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        video = query.get('video', ['1'])[0] != '0'
+        # Letras confirmadas a partir de este event_id (al reconectar no se pierden las intermedias)
+        after = query.get('after', ['0'])[0]
+        if not after.isdecimal():
+            # Se rechaza antes de aceptar: 1008 = violación de política (parámetro inválido)
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+        last_event_id = int(after)
+
+        session_key = None
+        if self._origin_allowed(scope):
+            session_key = await self._session_key(scope)
+        if session_key is None:
+            # Sin sesión del detector (la crea la página principal) o de otro origen
+            await send({'type': 'websocket.close', 'code': 4403})
+            return
+
+        try:
+            # Cargar el modelo fuera del event loop si todavía no está listo
+            await sync_to_async(detector_loader.get, thread_sensitive=False)()
+        except Exception:
+            await send({'type': 'websocket.close', 'code': 1011})
+            return
+
+        await send({'type': 'websocket.accept'})
+
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def notify():
+            loop.call_soon_threadsafe(wakeup.set)
+
+        detector.add_listener(notify)
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            last_data, last_frame_id = None, 0
+            while not disconnected.done():
+                wakeup.clear()
+                # get() también mantiene viva la sesión aunque el cliente no haga peticiones
+                session = detector.sessions.get(session_key, SOURCE_CAMERA)
+                snapshot = session.result
+                if detector.is_running:
+                    data = snapshot.as_data()
+                    # El frame_id cambia en cada frame: la imagen ya viaja en binario
+                    del data['frame_id']
+                else:
+                    data = {'letter': 'DETENIDO', 'confidence': 0, 'status': 'stopped'}
+
+                events = session.events_since(last_event_id)
+                if data != last_data or events:
+                    with detector.metrics.span('serialize'):
+                        text = json.dumps(dict(data, events=events) if events else data)
+                    await send({'type': 'websocket.send', 'text': text})
+                    last_data = data
+                    if events:
+                        last_event_id = events[-1]['event_id']
+                if video and detector.is_running and snapshot.frame is not None \
+                        and snapshot.frame_id != last_frame_id:
+                    await send({'type': 'websocket.send', 'bytes': snapshot.frame})
+                    last_frame_id = snapshot.frame_id
+
+                waiter = asyncio.ensure_future(wakeup.wait())
+                await asyncio.wait(
+                    {waiter, disconnected}, timeout=self.keepalive,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                waiter.cancel()
+        finally:
+            detector.remove_listener(notify)
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        """Consumir mensajes del cliente hasta que se desconecte"""
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+
+    @staticmethod
+    def _headers(scope):
+        return {name.decode('latin-1'): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+    def _origin_allowed(self, scope):
+        """Rechazar conexiones desde páginas de otros hosts (la cookie viaja igual)"""
+        origin = self._headers(scope).get('origin')
+        if not origin:
+            return True
+        allowed_hosts = settings.ALLOWED_HOSTS
+        if settings.DEBUG and not allowed_hosts:
+            allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+        return validate_host(urlsplit(origin).hostname or '', allowed_hosts)
+
+    async def _session_key(self, scope):
+        """Clave de DetectionSession guardada en la sesión de Django del navegador"""
+        cookie = SimpleCookie()
+        cookie.load(self._headers(scope).get('cookie', ''))
+        morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+        if morsel is None:
+            return None
+        store = import_module(settings.SESSION_ENGINE).SessionStore(session_key=morsel.value)
+        return await sync_to_async(store.get)('detector_session')
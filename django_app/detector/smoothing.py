@@ -0,0 +1,99 @@
+import itertools
+import time
+from collections import deque
+
+
+NO_LETTER = "NINGUNA"
+
+
+class TemporalSmoother:
+    """Votación ponderada por confianza sobre las últimas detecciones de una sesión.
+
+    Los pesos por letra se actualizan al entrar y salir cada detección de la
+    ventana (sin recontar la historia). decay < 1 da más peso a lo reciente:
+    en vez de multiplicar todos los pesos en cada frame se agranda la escala
+    de los nuevos y se renormaliza de vez en cuando.
+
+    La letra confirmada solo cambia si la nueva líder reúne min_votes
+    detecciones y pasaron min_hold segundos desde el último cambio; cada
+    cambio queda registrado como evento con id incremental.
+    """
+
+    def __init__(self, window=7, decay=1.0, min_samples=3, min_votes=2, min_hold=0.0, max_events=32):
+        self.window = window
+        self.decay = decay
+        self.min_samples = min_samples
+        self.min_votes = min_votes
+        self.min_hold = min_hold
+        self._entries = deque()
+        self._weights = {}
+        self._counts = {}
+        self._scale = 1.0
+
+        self.committed = None
+        self.committed_at = 0.0
+        self.events = deque(maxlen=max_events)
+        self._event_ids = itertools.count(1)
+
+    def update(self, letter, confidence, now=None):
+        """Registrar una detección y devolver la letra a mostrar"""
+        now = time.time() if now is None else now
+        if self.decay < 1.0:
+            self._scale /= self.decay
+            if self._scale > 1e6:
+                self._renormalize()
+
+        # Sin mano no se vota (igual que antes): se muestra tal cual
+        if letter == NO_LETTER:
+            return letter
+
+        weight = max(confidence, 1) / 100.0 * self._scale
+        self._entries.append((letter, weight))
+        self._weights[letter] = self._weights.get(letter, 0.0) + weight
+        self._counts[letter] = self._counts.get(letter, 0) + 1
+        if len(self._entries) > self.window:
+            old_letter, old_weight = self._entries.popleft()
+            self._weights[old_letter] -= old_weight
+            self._counts[old_letter] -= 1
+            if not self._counts[old_letter]:
+                del self._weights[old_letter]
+                del self._counts[old_letter]
+
+        if len(self._entries) < self.min_samples:
+            return self.committed or letter
+
+        leader = max(self._weights, key=self._weights.get)
+        if leader != self.committed and self._counts[leader] >= self.min_votes and self.can_change(now):
+            self._commit(leader, now)
+        return self.committed or letter
+
+    def can_change(self, now=None):
+        """False mientras dure el tiempo mínimo de la letra confirmada (puede saltarse la inferencia)"""
+        if self.committed is None:
+            return True
+        now = time.time() if now is None else now
+        return now - self.committed_at >= self.min_hold
+
+    def last_event(self):
+        return self.events[-1] if self.events else None
+
+    def events_since(self, event_id):
+        """Cambios de letra posteriores a event_id (solo se guardan los últimos max_events)"""
+        return [event for event in self.events if event['event_id'] > event_id]
+
+    def _commit(self, letter, now):
+        self.committed = letter
+        self.committed_at = now
+        share = self._weights[letter] / sum(self._weights.values())
+        self.events.append({
+            'event_id': next(self._event_ids),
+            'letter': letter,
+            'share': round(share, 3),
+            'timestamp': now,
+        })
+
+    def _renormalize(self):
+        scale = self._scale
+        self._entries = deque((letter, weight / scale) for letter, weight in self._entries)
+        self._weights = {letter: weight / scale for letter, weight in self._weights.items()}
+        self._scale = 1.0
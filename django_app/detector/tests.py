@@ -0,0 +1,671 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.test import RequestFactory, SimpleTestCase
+
+from .backends import ExportedGraphBackend
+from .batching import MicroBatcher
+from .detector_service import (
+    EMPTY_SNAPSHOT, ENGINE_LANDMARKS, ENGINE_YOLO, REUSE_RESULT, SOURCE_CAMERA, SOURCE_UPLOAD,
+    SessionPool, SignLanguageDetector,
+)
+from .evaluation import DetectionEvaluator
+from .landmarks import KNNLandmarkClassifier, landmark_features, normalized_landmarks
+from .metrics import MetricsRegistry
+from .motion import MotionGate
+from .pipeline import Pipeline
+from .realtime import DetectionSocket
+from .smoothing import NO_LETTER, TemporalSmoother
+from .tracking import HandValidationCache, RoiTracker
+from .views import get_detection_data
+
+
+class TemporalSmootherTests(SimpleTestCase):
+    """Votación incremental: ventana, decaimiento e histéresis (sin modelo)"""
+
+    def feed(self, smoother, letters, confidence=90, start=0.0, step=0.1):
+        """Pasar una secuencia de letras y devolver la última letra mostrada"""
+        shown = None
+        for index, letter in enumerate(letters):
+            shown = smoother.update(letter, confidence, now=start + index * step)
+        return shown
+
+    def test_returns_raw_letter_until_min_samples(self):
+        smoother = TemporalSmoother(window=5, min_samples=3, min_votes=1)
+        self.assertEqual(smoother.update('A', 90, now=0.0), 'A')
+        self.assertEqual(smoother.update('B', 90, now=0.1), 'B')
+        self.assertIsNone(smoother.committed)
+
+    def test_no_letter_is_not_voted(self):
+        smoother = TemporalSmoother(window=3, min_samples=1, min_votes=1)
+        self.feed(smoother, 'AA')
+        self.assertEqual(smoother.update(NO_LETTER, 0, now=1.0), NO_LETTER)
+        self.assertEqual(len(smoother._entries), 2)
+        self.assertEqual(smoother.committed, 'A')
+
+    def test_old_detections_leave_the_window(self):
+        smoother = TemporalSmoother(window=3, min_samples=1, min_votes=1)
+        self.feed(smoother, 'AAA')
+        self.assertEqual(self.feed(smoother, 'BB', start=1.0), 'B')
+        self.assertEqual(smoother._counts, {'A': 1, 'B': 2})
+
+        self.feed(smoother, 'B', start=2.0)
+        # La letra que ya no tiene votos desaparece de los pesos
+        self.assertEqual(smoother._counts, {'B': 3})
+        self.assertNotIn('A', smoother._weights)
+        self.assertAlmostEqual(smoother._weights['B'], 3 * 0.9)
+
+    def test_weights_follow_confidence(self):
+        smoother = TemporalSmoother(window=5, min_samples=1, min_votes=1)
+        smoother.update('A', 90, now=0.0)
+        smoother.update('B', 30, now=0.1)
+        smoother.update('B', 30, now=0.2)
+        # Dos votos de 30 % no superan uno de 90 %
+        self.assertEqual(smoother.committed, 'A')
+
+    def test_decay_favours_recent_detections(self):
+        steady = TemporalSmoother(window=5, decay=1.0, min_samples=1, min_votes=1)
+        steady.update('A', 90, now=0.0)
+        steady.update('B', 50, now=0.1)
+        self.assertEqual(steady.committed, 'A')
+
+        decayed = TemporalSmoother(window=5, decay=0.5, min_samples=1, min_votes=1)
+        decayed.update('A', 90, now=0.0)
+        decayed.update('B', 50, now=0.1)
+        # Con decay 0.5 el 90 % anterior pesa 0.45 frente al 50 % actual
+        self.assertEqual(decayed.committed, 'B')
+
+    def test_renormalization_keeps_relative_weights(self):
+        smoother = TemporalSmoother(window=4, decay=0.5, min_samples=1, min_votes=1)
+        self.feed(smoother, 'A' * 40 + 'BB', step=0.01)
+        # La escala se renormalizó en el camino en vez de crecer sin límite
+        self.assertLess(smoother._scale, 1e6)
+        self.assertEqual(smoother._counts, {'A': 2, 'B': 2})
+        # Los dos votos recientes de B pesan más que los dos más viejos de A
+        self.assertAlmostEqual(smoother._weights['B'] / smoother._weights['A'], 4.0)
+        self.assertEqual(smoother.committed, 'B')
+
+    def test_min_votes_blocks_single_outlier(self):
+        smoother = TemporalSmoother(window=3, min_samples=1, min_votes=2)
+        self.feed(smoother, 'AA')
+        smoother.update('B', 100, now=1.0)
+        smoother.update('C', 100, now=1.1)
+        # B y C lideran por peso con un solo voto cada una: se mantiene A
+        self.assertEqual(smoother.committed, 'A')
+
+    def test_min_hold_delays_the_switch(self):
+        smoother = TemporalSmoother(window=3, min_samples=1, min_votes=2, min_hold=1.0)
+        self.feed(smoother, 'AA')
+        committed_at = smoother.committed_at
+
+        self.assertEqual(self.feed(smoother, 'BBB', start=committed_at + 0.2), 'A')
+        self.assertFalse(smoother.can_change(committed_at + 0.5))
+
+        self.assertEqual(smoother.update('B', 90, now=committed_at + 1.0), 'B')
+        self.assertEqual(smoother.committed_at, committed_at + 1.0)
+
+    def test_events_since_returns_later_commits(self):
+        smoother = TemporalSmoother(window=3, min_samples=1, min_votes=2, max_events=2)
+        self.feed(smoother, 'AA')
+        self.feed(smoother, 'BBB', start=1.0)
+        self.feed(smoother, 'CCC', start=2.0)
+
+        self.assertEqual([event['letter'] for event in smoother.events_since(1)], ['B', 'C'])
+        self.assertEqual([event['event_id'] for event in smoother.events_since(2)], [3])
+        self.assertEqual(smoother.last_event()['letter'], 'C')
+        # Solo se conservan los últimos max_events cambios
+        self.assertEqual([event['event_id'] for event in smoother.events_since(0)], [2, 3])
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """Agrupación de frames en lotes con una función predict de prueba"""
+
+    def setUp(self):
+        self.batches = []
+
+    def predict(self, frames):
+        self.batches.append(list(frames))
+        return [frame * 10 for frame in frames]
+
+    def test_splits_pending_frames_by_max_batch(self):
+        batcher = MicroBatcher(self.predict, window_ms=200, max_batch=3)
+        futures = batcher.submit_many(range(7))
+
+        self.assertEqual([future.result(timeout=2) for future in futures], [0, 10, 20, 30, 40, 50, 60])
+        self.assertEqual([len(batch) for batch in self.batches], [3, 3, 1])
+        stats = batcher.stats()
+        self.assertEqual((stats['batches'], stats['frames'], stats['last_batch_size']), (3, 7, 1))
+
+    def test_window_closes_a_partial_batch(self):
+        batcher = MicroBatcher(self.predict, window_ms=20, max_batch=8)
+        started = time.perf_counter()
+        self.assertEqual(batcher.submit(4).result(timeout=2), 40)
+        # No espera a llenar el lote: se corta al terminar la ventana
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(self.batches, [[4]])
+
+    def test_cancelled_futures_are_not_predicted(self):
+        release = threading.Event()
+
+        def blocking_predict(frames):
+            release.wait(timeout=2)
+            return self.predict(frames)
+
+        batcher = MicroBatcher(blocking_predict, window_ms=0, max_batch=8)
+        first = batcher.submit(1)
+        while not first.running():
+            time.sleep(0.001)
+        # Mientras el primer lote está en el modelo, estos esperan en la cola
+        cancelled = batcher.submit(2)
+        kept = batcher.submit(3)
+        self.assertTrue(cancelled.cancel())
+        release.set()
+
+        self.assertEqual(first.result(timeout=2), 10)
+        self.assertEqual(kept.result(timeout=2), 30)
+        self.assertEqual(self.batches, [[1], [3]])
+
+    def test_predict_errors_reach_every_future_in_the_batch(self):
+        calls = []
+
+        def failing_predict(frames):
+            calls.append(len(frames))
+            if len(calls) == 1:
+                raise RuntimeError('fallo del modelo')
+            return self.predict(frames)
+
+        batcher = MicroBatcher(failing_predict, window_ms=200, max_batch=2)
+        futures = batcher.submit_many([1, 2])
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, 'fallo del modelo'):
+                future.result(timeout=2)
+
+        # El hilo sigue vivo para los lotes siguientes
+        self.assertEqual(batcher.submit(5).result(timeout=2), 50)
+        self.assertEqual(batcher.stats()['errors'], 1)
+
+
+class FakeGrabber:
+    """Entrega los frames dados al bucle de inferencia y después lo detiene"""
+
+    def __init__(self, detector, frames):
+        self.detector = detector
+        self.frames = list(frames)
+        self.frame_id = 0
+
+    def get_latest(self, last_id, timeout=None):
+        if not self.frames:
+            self.detector.is_running = False
+            return last_id, None
+        self.frame_id += 1
+        return self.frame_id, self.frames.pop(0)
+
+
+def loop_detector(snapshot, **attributes):
+    """SignLanguageDetector con solo lo que usa _inference_loop (sin modelo ni cámara)"""
+    detector = SignLanguageDetector.__new__(SignLanguageDetector)
+    detector.__dict__.update(
+        inference_fps=1000, is_running=True, last_frame_id=0, sessions=SessionPool(['A', 'B']),
+        default_engine=ENGINE_YOLO, landmark_classifier=None, motion_gate=None, skip_stable=False,
+        pipeline=None, snapshot=EMPTY_SNAPSHOT, metrics=MetricsRegistry(), skipped_frames=0,
+        tracker=None, validation_cache=None, client_overlay=True, processed=[],
+    )
+
+    def analyze(frame_id, frame, detections, render=True, validation=None):
+        detector.processed.append(frame_id)
+        return snapshot.replace(frame_id=frame_id)
+
+    # YOLO y MediaPipe de mentira; las etapas del bucle son las reales
+    detector.detect_tracked = lambda frames, tracker: [(np.zeros((0, 6), np.float32), False)] * len(frames)
+    detector.analyze = analyze
+    detector.render_snapshot = lambda rendered, frame, view=None: rendered
+    detector._publish = lambda published, view=None: setattr(detector, 'snapshot', published)
+    detector.__dict__.update(attributes)
+    return detector
+
+
+class SessionSourceTests(SimpleTestCase):
+    """La cámara del servidor solo alimenta a las sesiones que la miran"""
+
+    def test_camera_frames_do_not_reach_upload_sessions(self):
+        detector = loop_detector(EMPTY_SNAPSHOT.replace(letter='A', confidence=90, timestamp=0.0))
+        camera = detector.sessions.get('camera', SOURCE_CAMERA)
+        upload = detector.sessions.get('upload', SOURCE_UPLOAD)
+        camera.start_training_mode()
+        upload.start_training_mode()
+
+        detector._inference_loop(FakeGrabber(detector, [np.zeros((4, 4, 3), np.uint8)] * 3))
+
+        self.assertEqual(camera.training.total_attempts, 3)
+        self.assertEqual(upload.training.total_attempts, 0)
+        self.assertIsNone(upload.smoother.last_event())
+        self.assertIs(upload.result, EMPTY_SNAPSHOT)
+
+    def test_active_filters_by_source(self):
+        pool = SessionPool(['A'])
+        pool.get('idle')
+        pool.get('camera', SOURCE_CAMERA)
+        pool.get('upload', SOURCE_UPLOAD)
+        self.assertEqual([session.key for session in pool.active(SOURCE_CAMERA)], ['camera'])
+        self.assertEqual(len(pool.active()), 3)
+        # Usar la sesión sin indicar origen no cambia el registrado
+        self.assertEqual(pool.get('camera').source, SOURCE_CAMERA)
+
+
+class MotionGateTests(SimpleTestCase):
+    """Reutilización de resultados con la escena quieta"""
+
+    def frame(self, value):
+        return np.full((48, 64, 3), value, np.uint8)
+
+    def test_skips_frames_below_threshold(self):
+        gate = MotionGate(threshold=4.0, max_skip=10)
+        self.assertTrue(gate.should_process(self.frame(100)))
+        self.assertFalse(gate.should_process(self.frame(102)))
+        self.assertTrue(gate.should_process(self.frame(110)))
+        self.assertEqual(gate.stats()['skipped'], 1)
+        self.assertEqual(gate.stats()['processed'], 2)
+
+    def test_compares_against_last_processed_frame(self):
+        gate = MotionGate(threshold=4.0, max_skip=10)
+        gate.should_process(self.frame(100))
+        self.assertFalse(gate.should_process(self.frame(102)))
+        # Un cambio lento se acumula respecto del último frame procesado
+        self.assertTrue(gate.should_process(self.frame(104)))
+
+    def test_max_skip_forces_inference(self):
+        gate = MotionGate(threshold=4.0, max_skip=2)
+        decisions = [gate.should_process(self.frame(100)) for _ in range(7)]
+        self.assertEqual(decisions, [True, False, False, True, False, False, True])
+
+    def test_reset_forgets_the_reference(self):
+        gate = MotionGate(threshold=4.0, max_skip=10)
+        gate.should_process(self.frame(100))
+        gate.reset()
+        self.assertTrue(gate.should_process(self.frame(100)))
+
+    def test_camera_loop_reuses_static_frames(self):
+        snapshot = EMPTY_SNAPSHOT.replace(letter='A', confidence=90, frame=b'jpeg', timestamp=0.0)
+        detector = loop_detector(snapshot, motion_gate=MotionGate(threshold=4.0, max_skip=10))
+        detector.sessions.get('camera', SOURCE_CAMERA)
+        detector._inference_loop(FakeGrabber(detector, [self.frame(100)] * 4))
+        # El primer frame no tiene resultado previo; el segundo fija la referencia del gate
+        self.assertEqual(detector.processed, [1, 2])
+
+    def test_training_sessions_see_every_frame(self):
+        snapshot = EMPTY_SNAPSHOT.replace(letter='A', confidence=90, frame=b'jpeg', timestamp=0.0)
+        detector = loop_detector(snapshot, motion_gate=MotionGate(threshold=4.0, max_skip=10))
+        camera = detector.sessions.get('camera', SOURCE_CAMERA)
+        camera.start_training_mode()
+        detector._inference_loop(FakeGrabber(detector, [self.frame(100)] * 4))
+        self.assertEqual(detector.processed, [1, 2, 3, 4])
+        self.assertEqual(camera.training.total_attempts, 4)
+
+
+def hand(spread, offset=(0.0, 0.0), scale=1.0):
+    """21 puntos sintéticos: la muñeca en el origen y los dedos abiertos según spread"""
+    angles = np.linspace(-spread, spread, 20)
+    radii = np.tile([0.4, 0.6, 0.8, 1.0], 5)
+    points = np.vstack([[0.0, 0.0], np.column_stack([np.sin(angles), -np.cos(angles)]) * radii[:, None]])
+    return points * scale + offset
+
+
+class LandmarkClassifierTests(SimpleTestCase):
+    """Clasificador KNN sobre landmarks y respaldo con YOLO"""
+
+    def classifier(self, k=3):
+        features = [landmark_features(hand(spread)) for spread in (0.2, 0.25, 0.3, 1.2, 1.25, 1.3)]
+        return KNNLandmarkClassifier(features, [0, 0, 0, 1, 1, 1], k=k)
+
+    def test_features_ignore_position_and_scale(self):
+        np.testing.assert_allclose(
+            landmark_features(hand(0.5)), landmark_features(hand(0.5, offset=(200, 120), scale=80)), atol=1e-5,
+        )
+
+    def test_predicts_nearest_class(self):
+        classifier = self.classifier()
+        class_id, confidence = classifier.predict(hand(0.22, offset=(300, 200), scale=90))
+        self.assertEqual(class_id, 0)
+        self.assertGreater(confidence, 0.5)
+        self.assertEqual(classifier.predict(hand(1.28))[0], 1)
+
+    def test_confidence_is_the_weighted_vote_share(self):
+        classifier = self.classifier(k=6)
+        class_id, confidence = classifier.predict(hand(0.25))
+        self.assertEqual(class_id, 0)
+        # Un vecino idéntico domina el voto ponderado por 1/distancia
+        self.assertGreater(confidence, 0.99)
+        self.assertLessEqual(confidence, 1.0)
+
+    def test_save_and_load_round_trip(self):
+        classifier = self.classifier()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'landmarks.npz')
+            classifier.save(path)
+            loaded = KNNLandmarkClassifier.load(path)
+        self.assertEqual(loaded.k, classifier.k)
+        self.assertEqual(loaded.predict(hand(1.22)), classifier.predict(hand(1.22)))
+
+    def test_falls_back_to_yolo_without_classifier(self):
+        detector = loop_detector(EMPTY_SNAPSHOT)
+        session = detector.sessions.get('camera', SOURCE_CAMERA)
+        session.engine = ENGINE_LANDMARKS
+        self.assertEqual(detector.engine_for(session), ENGINE_YOLO)
+        self.assertEqual(detector.camera_engine(), ENGINE_YOLO)
+
+        detector.landmark_classifier = self.classifier()
+        self.assertEqual(detector.engine_for(session), ENGINE_LANDMARKS)
+        self.assertEqual(detector.camera_engine(), ENGINE_LANDMARKS)
+
+    def test_camera_engine_ignores_upload_sessions(self):
+        detector = loop_detector(EMPTY_SNAPSHOT, landmark_classifier=self.classifier())
+        detector.sessions.get('camera', SOURCE_CAMERA).engine = ENGINE_LANDMARKS
+        detector.sessions.get('upload', SOURCE_UPLOAD)  # Sigue con el motor por defecto
+        self.assertEqual(detector.camera_engine(), ENGINE_LANDMARKS)
+
+        # Otra sesión de la cámara con YOLO obliga a usar YOLO para todas
+        detector.sessions.get('other', SOURCE_CAMERA)
+        self.assertEqual(detector.camera_engine(), ENGINE_YOLO)
+
+
+class OverlayViewTests(SimpleTestCase):
+    """El MJPEG dibuja el resultado suavizado de la sesión, no la letra cruda"""
+
+    def test_publish_stage_draws_the_session_result(self):
+        raw = EMPTY_SNAPSHOT.replace(letter='B', confidence=90.0, timestamp=1.0)
+        detector = loop_detector(raw, client_overlay=False)
+        session = detector.sessions.get('camera', SOURCE_CAMERA)
+        for timestamp in (0.1, 0.2, 0.3):
+            session.observe(raw.replace(letter='A', timestamp=timestamp))
+        session.start_training_mode()
+        drawn = []
+        detector.render_snapshot = lambda rendered, frame, view=None: drawn.append(view) or rendered
+
+        detector._process_serial((1, np.zeros((4, 4, 3), np.uint8), ENGINE_YOLO, [session]))
+
+        # Un solo frame con B no basta para cambiar la letra confirmada
+        self.assertEqual(drawn[0].letter, 'A')
+        self.assertEqual(drawn[0].training['target_letter'], session.training.target_letter)
+
+    def test_normalized_landmarks_are_rounded(self):
+        points = np.array([[1.0, 2.0], [639.0, 479.0]]) / 3
+        normalized = normalized_landmarks(points, (480, 640, 3))
+        self.assertEqual(normalized, [[0.0005, 0.0014], [0.3328, 0.3326]])
+
+
+class EventCursorValidationTests(SimpleTestCase):
+    """?after= inválido se rechaza antes de tocar el detector o aceptar el WebSocket"""
+
+    def test_detection_data_rejects_invalid_after(self):
+        for after in ('abc', '-1', '1.5', ''):
+            response = get_detection_data(RequestFactory().get('/detection-data/', {'after': after}))
+            self.assertEqual(response.status_code, 400, after)
+            self.assertEqual(json.loads(response.content)['status'], 'error')
+
+    def test_websocket_closes_before_accept(self):
+        messages = [{'type': 'websocket.connect'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'websocket', 'path': '/ws/detection/', 'query_string': b'after=abc', 'headers': []}
+        asyncio.run(DetectionSocket(keepalive=1)(scope, receive, send))
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 1008}])
+
+
+class RoiTrackerTests(SimpleTestCase):
+    """Recorte alrededor de la última mano y vuelta al frame completo"""
+
+    shape = (480, 640, 3)
+
+    def test_region_pads_the_last_box(self):
+        tracker = RoiTracker(padding=0.5, min_size=0)
+        self.assertIsNone(tracker.region(self.shape))  # Sin mano: frame completo
+
+        tracker.update((300, 200, 340, 260), None, False, self.shape)
+        # Lado 60 * (1 + 2 * 0.5) = 120 centrado en (320, 230)
+        self.assertEqual(tracker.region(self.shape), (260, 170, 380, 290))
+
+    def test_region_includes_landmarks_and_clips_to_the_frame(self):
+        tracker = RoiTracker(padding=0.0, min_size=100)
+        landmarks = [[0.0, 0.0], [0.25, 0.25]]  # Esquina superior izquierda: (0, 0) - (160, 120)
+        tracker.update((10, 10, 30, 20), landmarks, False, self.shape)
+        self.assertEqual(tracker.box, (0.0, 0.0, 160.0, 120.0))
+        # Lado 160 centrado en (80, 60): el borde superior queda recortado en 0
+        self.assertEqual(tracker.region(self.shape), (0, 0, 160, 140))
+
+    def test_reacquires_the_full_frame(self):
+        tracker = RoiTracker(min_size=0, full_frame_interval=2)
+        box = (300, 200, 340, 260)
+        tracker.update(box, None, False, self.shape)
+        tracker.update(box, None, True, self.shape)
+        self.assertIsNotNone(tracker.region(self.shape))
+        tracker.update(box, None, True, self.shape)
+        self.assertIsNone(tracker.region(self.shape))  # Cada full_frame_interval frames
+
+        tracker.update(box, None, False, self.shape)
+        self.assertIsNotNone(tracker.region(self.shape))
+        tracker.update(None, None, True, self.shape)
+        self.assertIsNone(tracker.region(self.shape))  # Mano perdida
+        self.assertEqual(tracker.stats(), {
+            'tracking': False, 'roi_frames': 3, 'full_frames': 2, 'lost': 1, 'roi_ratio': 0.6,
+        })
+
+    def test_skips_a_region_covering_the_frame(self):
+        tracker = RoiTracker(padding=1.0, min_size=0)
+        tracker.update((100, 40, 540, 440), None, False, self.shape)
+        self.assertIsNone(tracker.region(self.shape))
+
+    def test_maps_detections_back_to_the_frame(self):
+        detections = np.array([[10, 20, 50, 60, 0.5, 3]], dtype=np.float32)
+        mapped = RoiTracker.to_frame_coordinates(detections, (100, 200, 300, 400))
+        np.testing.assert_array_equal(mapped, [[110, 220, 150, 260, 0.5, 3]])
+        self.assertEqual(detections[0, 0], 10)  # No modifica el array original
+        self.assertEqual(len(RoiTracker.to_frame_coordinates(np.zeros((0, 6)), (5, 5, 9, 9))), 0)
+
+        frame = np.arange(480 * 640).reshape(480, 640)
+        crop = RoiTracker.crop(frame, (100, 200, 300, 400))
+        self.assertEqual(crop.shape, (200, 200))
+        self.assertEqual(crop[0, 0], frame[200, 100])
+
+
+class HandValidationCacheTests(SimpleTestCase):
+    """Reutilizar los landmarks de MediaPipe mientras la caja no se mueve"""
+
+    shape = (400, 800, 3)
+    box = (100, 100, 200, 200)
+    points = np.array([[100.0, 100.0], [150.0, 200.0]])
+
+    def test_hit_moves_points_to_the_new_box(self):
+        cache = HandValidationCache(iou_threshold=0.7)
+        self.assertIsNone(cache.lookup(self.box, self.shape))  # Vacía
+        cache.store(self.box, self.points)
+
+        # Desplazada 4 px: IoU = 9600 / 10400 >= 0.7, los puntos se trasladan con la caja
+        self.assertEqual(cache.lookup((104, 100, 204, 200), self.shape), [[0.13, 0.25], [0.1925, 0.5]])
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_miss_below_the_iou_threshold(self):
+        cache = HandValidationCache(iou_threshold=0.7)
+        cache.store(self.box, self.points)
+        # Desplazada 20 px: IoU = 8000 / 12000 < 0.7
+        self.assertIsNone(cache.lookup((120, 100, 220, 200), self.shape))
+        self.assertEqual(cache.hits, 0)
+
+    def test_max_age_forces_a_new_validation(self):
+        cache = HandValidationCache(max_age=2)
+        cache.store(self.box, self.points)
+        self.assertIsNotNone(cache.lookup(self.box, self.shape))
+        self.assertIsNotNone(cache.lookup(self.box, self.shape))
+        self.assertIsNone(cache.lookup(self.box, self.shape))
+
+        cache.store(self.box, self.points)  # Nueva validación de MediaPipe
+        self.assertIsNotNone(cache.lookup(self.box, self.shape))
+        cache.invalidate()
+        self.assertIsNone(cache.lookup(self.box, self.shape))
+
+
+class FakeGraphBackend(ExportedGraphBackend):
+    """Grafo exportado de mentira: devuelve siempre la misma salida YOLOv8"""
+
+    def __init__(self, output, **options):
+        super().__init__('fake.onnx', **options)
+        self.output = np.asarray(output, dtype=np.float32)
+        self.batches = []
+
+    def _infer(self, batch):
+        self.batches.append(batch)
+        return np.repeat(self.output[None], len(batch), axis=0)
+
+
+class ExportedGraphBackendTests(SimpleTestCase):
+    """Letterbox, NMS por clase y vuelta a coordenadas del frame"""
+
+    def test_letterbox_keeps_aspect_ratio(self):
+        backend = FakeGraphBackend(np.zeros((7, 0)), imgsz=320)
+        canvas, ratio, offset = backend.letterbox(np.zeros((200, 400, 3), np.uint8))
+        self.assertEqual(canvas.shape, (320, 320, 3))
+        self.assertEqual((ratio, offset), (0.8, (0, 80)))
+        # Relleno gris arriba y abajo, la imagen escalada en el medio
+        self.assertTrue((canvas[:80] == 114).all() and (canvas[240:] == 114).all())
+        self.assertTrue((canvas[80:240] == 0).all())
+
+    def test_predict_applies_nms_per_class_and_undoes_the_letterbox(self):
+        # Columnas: (cx, cy, w, h) en el lienzo de 320 + puntaje de 3 clases
+        output = np.array([
+            [160, 160, 80, 80, 0.0, 0.9, 0.0],
+            [164, 160, 80, 80, 0.0, 0.8, 0.0],  # Solapa con la primera: la quita el NMS
+            [160, 160, 80, 80, 0.0, 0.0, 0.7],  # Misma caja, otra clase: se conserva
+            [40, 40, 20, 20, 0.3, 0.0, 0.0],    # Bajo conf
+        ]).T
+        backend = FakeGraphBackend(output, imgsz=320, conf=0.6, iou=0.45)
+        detections, = backend.predict([np.zeros((200, 400, 3), np.uint8)])
+
+        self.assertEqual(backend.batches[0].shape, (1, 3, 320, 320))
+        # x: 120 / 0.8 = 150; y: (120 - 80) / 0.8 = 50
+        np.testing.assert_allclose(detections, [
+            [150, 50, 250, 150, 0.9, 1],
+            [150, 50, 250, 150, 0.7, 2],
+        ], rtol=1e-6)
+
+    def test_boxes_are_clipped_and_empty_output_keeps_the_shape(self):
+        output = np.array([[10, 100, 40, 40, 0.95]]).T  # Sale por el relleno izquierdo del frame
+        backend = FakeGraphBackend(output, imgsz=320)
+        detections, = backend.predict([np.zeros((400, 200, 3), np.uint8)])
+        # Frame vertical: ratio 0.8, relleno izquierdo 80 -> x1 = (-10 - 80) / 0.8 < 0
+        np.testing.assert_allclose(detections[0, :4], [0, 100, 0, 150])
+
+        backend.conf = 0.99
+        self.assertEqual(backend.predict([np.zeros((400, 200, 3), np.uint8)])[0].shape, (0, 6))
+
+
+class DetectionEvaluatorTests(SimpleTestCase):
+    """AP con IoU 0.5 sobre un caso calculado a mano"""
+
+    def test_map50_on_a_hand_computed_case(self):
+        evaluator = DetectionEvaluator(num_classes=3)
+        # Imagen 1: un acierto (0.9) y un duplicado de la misma mano (0.8, falso positivo)
+        evaluator.add(
+            np.array([[0, 0, 10, 10, 0.8, 0], [0, 0, 10, 10, 0.9, 0]], dtype=np.float32),
+            np.array([[0, 0, 0, 10, 10]], dtype=np.float32),
+        )
+        # Imagen 2: acierto (0.7), caja lejana (0.6), clase 1 con IoU 1/3 y clase 2 sin etiquetas
+        evaluator.add(
+            np.array([
+                [0, 0, 10, 10, 0.7, 0], [50, 50, 60, 60, 0.6, 0],
+                [20, 0, 30, 10, 0.9, 1], [0, 0, 10, 10, 0.5, 2],
+            ], dtype=np.float32),
+            np.array([[0, 0, 0, 10, 10], [1, 25, 0, 35, 10]], dtype=np.float32),
+        )
+
+        # Clase 0 en orden de confianza: TP, FP, TP, FP con 2 etiquetas
+        # recall 0.5 con precisión 1 + recall 1.0 con precisión 2/3 -> 0.5 + 0.5 * 2/3
+        self.assertAlmostEqual(evaluator.average_precision(0), 5 / 6)
+        self.assertEqual(evaluator.average_precision(1), 0.0)
+        self.assertIsNone(evaluator.average_precision(2))
+
+        mean, per_class = evaluator.map50()
+        self.assertEqual(set(per_class), {0, 1})
+        self.assertAlmostEqual(mean, 5 / 12)
+        self.assertEqual(evaluator.images, 2)
+
+    def test_perfect_detections_give_ap_one(self):
+        evaluator = DetectionEvaluator(num_classes=1)
+        evaluator.add(np.array([[0, 0, 10, 10, 0.9, 0]]), np.array([[0, 1, 1, 10, 10]]))
+        self.assertAlmostEqual(evaluator.map50()[0], 1.0)
+
+
+class PipelineTests(SimpleTestCase):
+    """Etapas en hilos: orden de llegada, descartes y frames reutilizados"""
+
+    def test_stages_run_in_order_and_keep_the_frame_order(self):
+        published = []
+
+        def slow_first(item):
+            time.sleep(0.02 if item == 0 else 0.0)  # El primero tarda: los demás no deben adelantarse
+            return [item, 'detect']
+
+        pipeline = Pipeline([
+            ('detect', slow_first),
+            ('analyze', lambda item: None if item[0] == 3 else item + ['analyze']),  # None descarta
+            ('publish', published.append),
+        ], queue_size=1)
+        pipeline.start()
+        for item in range(5):
+            self.assertTrue(pipeline.submit(item, timeout=1))
+        pipeline.stop()
+
+        self.assertEqual(published, [[item, 'detect', 'analyze'] for item in (0, 1, 2, 4)])
+        stats = pipeline.stats()
+        self.assertEqual(stats['analyze']['processed'], 5)
+        self.assertEqual(stats['analyze']['dropped'], 1)
+        self.assertEqual(stats['publish']['dropped'], 0)
+
+    def test_stage_errors_skip_the_item(self):
+        published = []
+
+        def fail_on_two(item):
+            if item == 2:
+                raise ValueError('frame roto')
+            return item
+
+        pipeline = Pipeline([('detect', fail_on_two), ('publish', published.append)])
+        pipeline.start()
+        for item in range(4):
+            pipeline.submit(item, timeout=1)
+        pipeline.stop()
+        self.assertEqual(published, [0, 1, 3])
+        self.assertEqual(pipeline.stats()['detect']['errors'], 1)
+
+    def test_reused_frames_are_published_behind_frames_in_flight(self):
+        detector = loop_detector(EMPTY_SNAPSHOT)
+        published = []
+
+        def analyze(frame_id, frame, detections, render=True, validation=None):
+            time.sleep(0.05 if frame_id == 1 else 0.0)  # YOLO lento en el primer frame
+            return EMPTY_SNAPSHOT.replace(frame_id=frame_id, letter=f'L{frame_id}')
+
+        def publish(snapshot, view=None):
+            detector.snapshot = snapshot
+            published.append((snapshot.frame_id, snapshot.letter))
+
+        detector.analyze = analyze
+        detector._publish = publish
+        pipeline = detector._create_pipeline()
+        pipeline.start()
+        frame = np.zeros((4, 4, 3), np.uint8)
+        for frame_id, engine in enumerate((ENGINE_YOLO, REUSE_RESULT, ENGINE_YOLO, REUSE_RESULT), 1):
+            pipeline.submit((frame_id, frame, engine, []), timeout=1)
+        pipeline.stop()
+
+        # Cada frame reutilizado lleva el resultado del anterior, aunque no pase por YOLO
+        self.assertEqual(published, [(1, 'L1'), (2, 'L1'), (3, 'L3'), (4, 'L3')])
@@ -0,0 +1,153 @@
+import numpy as np
+
+from .landmarks import normalized_landmarks
+
+
+class RoiTracker:
+    """Región de interés alrededor de la última mano detectada.
+
+    Tras una detección válida, los frames siguientes se procesan sobre un recorte
+    con margen alrededor de la caja anterior (ampliada con los landmarks de
+    MediaPipe si los hay). Cada full_frame_interval frames, o cuando se pierde
+    la mano, se vuelve a procesar el frame completo.
+    """
+
+    def __init__(self, padding=0.5, min_size=160, full_frame_interval=10):
+        self.padding = padding
+        self.min_size = min_size
+        self.full_frame_interval = full_frame_interval
+        self.box = None
+        self.frames_since_full = 0
+
+        # Métricas
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def region(self, frame_shape):
+        """(x1, y1, x2, y2) del recorte a procesar, o None para usar el frame completo"""
+        if self.box is None or self.frames_since_full >= self.full_frame_interval:
+            return None
+
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = self.box
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        side = max(x2 - x1, y2 - y1) * (1 + 2 * self.padding)
+        side = max(side, self.min_size)
+        half = side / 2
+
+        rx1, ry1 = int(max(cx - half, 0)), int(max(cy - half, 0))
+        rx2, ry2 = int(min(cx + half, width)), int(min(cy + half, height))
+        if rx2 - rx1 >= width * 0.9 and ry2 - ry1 >= height * 0.9:
+            # El recorte sería casi el frame completo: no vale la pena
+            return None
+        return rx1, ry1, rx2, ry2
+
+    @staticmethod
+    def crop(frame, region):
+        x1, y1, x2, y2 = region
+        return np.ascontiguousarray(frame[y1:y2, x1:x2])
+
+    @staticmethod
+    def to_frame_coordinates(detections, region):
+        """Desplazar detecciones de coordenadas del recorte a coordenadas del frame"""
+        if len(detections):
+            detections = detections.copy()
+            detections[:, [0, 2]] += region[0]
+            detections[:, [1, 3]] += region[1]
+        return detections
+
+    def update(self, box, landmarks, used_roi, frame_shape):
+        """Registrar el resultado validado del frame (box None = mano perdida)"""
+        if used_roi:
+            self.roi_frames += 1
+            self.frames_since_full += 1
+        else:
+            self.full_frames += 1
+            self.frames_since_full = 0
+
+        if box is None:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            return
+
+        x1, y1, x2, y2 = box
+        if landmarks:
+            # Incluir los landmarks para seguir a la mano aunque la caja YOLO quede corta
+            height, width = frame_shape[:2]
+            points = np.asarray(landmarks, dtype=np.float32) * (width, height)
+            x1, y1 = min(x1, points[:, 0].min()), min(y1, points[:, 1].min())
+            x2, y2 = max(x2, points[:, 0].max()), max(y2, points[:, 1].max())
+        self.box = (float(x1), float(y1), float(x2), float(y2))
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        return {
+            'tracking': self.box is not None,
+            'roi_frames': self.roi_frames,
+            'full_frames': self.full_frames,
+            'lost': self.lost,
+            'roi_ratio': round(self.roi_frames / total, 3) if total else 0,
+        }
+
+
+def _box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(x2 - x1, 0) * max(y2 - y1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class HandValidationCache:
+    """Último resultado de MediaPipe para la mano seguida.
+
+    Mientras la caja YOLO se mantenga casi en el mismo lugar (IoU >= iou_threshold)
+    se reutilizan los landmarks validados, trasladados a la caja nueva, y MediaPipe
+    solo se vuelve a ejecutar cada max_age frames.
+    """
+
+    def __init__(self, iou_threshold=0.7, max_age=5):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.box = None
+        self.points = None  # landmarks en píxeles del frame (21x2)
+        self.age = 0
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, box, frame_shape):
+        """Landmarks normalizados para box si el resultado en caché sigue valiendo, si no None"""
+        if self.box is None or self.age >= self.max_age or _box_iou(self.box, box) < self.iou_threshold:
+            self.misses += 1
+            return None
+        self.age += 1
+        self.hits += 1
+
+        # Llevar los puntos de la caja validada a la caja actual (escala + traslación)
+        old = np.asarray(self.box, dtype=np.float32)
+        new = np.asarray(box, dtype=np.float32)
+        scale = (new[2:] - new[:2]) / np.maximum(old[2:] - old[:2], 1)
+        points = (self.points - old[:2]) * scale + new[:2]
+        return normalized_landmarks(points, frame_shape)
+
+    def store(self, box, points):
+        """Guardar una validación exitosa de MediaPipe (puntos Nx2 en píxeles del frame)"""
+        self.box = box
+        self.points = points
+        self.age = 0
+
+    def invalidate(self):
+        self.box = None
+        self.points = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0,
+        }
@@ -7,9 +7,18 @@ urlpatterns = [
     path('stop/', views.stop_detection, name='stop_detection'),
     path('detection-data/', views.get_detection_data, name='get_detection_data'),
     path('video-feed/', views.video_feed, name='video_feed'),
+    path('frame/<int:frame_id>/', views.frame_image, name='frame_image'),
+    path('upload-frames/', views.upload_frames, name='upload_frames'),
     path('toggle-detection/', views.toggle_detection, name='toggle_detection'),
     path('test-camera/', views.test_camera, name='test_camera'),
     path('test-model/', views.test_model, name='test_model'),
+    path('stats/', views.detector_stats, name='detector_stats'),
+    path('health/', views.health, name='health'),
+    # Sin barra final: es la ruta que Prometheus consulta por defecto
+    path('metrics', views.metrics, name='metrics'),
+    path('metrics/debug/', views.metrics_debug, name='metrics_debug'),
+    path('profile/', views.profile, name='profile'),
+    path('set-engine/', views.set_engine, name='set_engine'),
     path('start-training/', views.start_training, name='start_training'),
     path('stop-training/', views.stop_training, name='stop_training'),
     path('training-feedback/', views.get_training_feedback, name='training_feedback'),
@@ -1,21 +1,49 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.http import JsonResponse, StreamingHttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
+import os
 import time
-import base64
-from .detector_service import detector
+import uuid
+from .detector_service import (
+    ENGINES, SOURCE_CAMERA, SOURCE_UPLOAD, DetectorLoader, detector, detector_loader, decode_image,
+)
+from .metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus
+from .profiling import profile_detector
+
+def _session_key(request):
+    """Clave de la sesión del detector guardada en la cookie del navegador"""
+    key = request.session.get('detector_session')
+    if key is None:
+        key = uuid.uuid4().hex
+        request.session['detector_session'] = key
+    return key
+
+def _get_session(request, source=None):
+    """Sesión del detector asociada al navegador que hace la petición"""
+    return detector.sessions.get(_session_key(request), source)
 
 def index(request):
     """Página principal del detector"""
-    return render(request, 'index.html')
+    # Guardar la clave de sesión desde el inicio (el WebSocket la lee de la cookie);
+    # la página no espera a que el modelo termine de cargar
+    _session_key(request)
+    return render(request, 'index.html', {
+        'client_overlay': getattr(settings, 'DETECTOR_CLIENT_OVERLAY', True),
+    })
 
 @csrf_exempt
 def start_detection(request):
     """Iniciar la detección de señas con diagnóstico mejorado"""
     try:
         print("=== VISTA START_DETECTION LLAMADA ===")
+        # Esta sesión mira la cámara del servidor: recibe sus detecciones
+        _get_session(request, SOURCE_CAMERA)
         success = detector.start_detection()
         if success:
             return JsonResponse({
@@ -61,7 +89,15 @@ def stop_detection(request):
 
 @csrf_exempt
 def get_detection_data(request):
-    """Obtener datos de detección actual"""
+    """Obtener datos de detección actual (solo lee el último snapshot publicado)"""
+    # ?after=<event_id>: letras confirmadas desde la última consulta del cliente
+    after = request.GET.get('after')
+    if after is not None and not after.isdecimal():
+        return JsonResponse({
+            'status': 'error',
+            'message': f'after debe ser un event_id entero: {after}'
+        }, status=400)
+        
     try:
         if not detector.is_running:
             return JsonResponse({
@@ -70,55 +106,154 @@ def get_detection_data(request):
                 'status': 'stopped'
             })
             
-        frame_data, letter, confidence, training_result = detector.process_frame()
+        # Solo metadatos: la imagen se descarga aparte desde /frame/<frame_id>/
+        session = _get_session(request, SOURCE_CAMERA)
+        with detector.metrics.span('serialize'):
+            data = session.result.as_data()
+            if after is not None:
+                data['events'] = session.events_since(int(after))
+            return JsonResponse(data)
         
-        if frame_data is None:
+    except Exception as e:
+        return JsonResponse({
+            'letter': 'ERROR',
+            'confidence': 0,
+            'status': 'error',
+            'message': str(e)
+        })
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_frames(request):
+    """Procesar frames de la cámara del navegador (multipart 'frames' o cuerpo binario)"""
+    try:
+        if request.content_type.startswith('multipart/'):
+            payloads = [upload.read() for upload in request.FILES.getlist('frames')]
+        else:
+            payloads = [request.body] if request.body else []
+            
+        if not payloads:
             return JsonResponse({
-                'letter': 'ERROR',
-                'confidence': 0,
-                'status': 'error'
+                'status': 'error',
+                'message': 'No se recibieron frames'
             })
             
-        response_data = {
-            'frame': frame_data,
-            'letter': letter,
-            'confidence': confidence,
-            'status': 'running'
-        }
-        
-        # Agregar información de entrenamiento si está activo
-        training_status = detector.get_training_status()
-        if training_status:
-            response_data['training'] = training_status
+        max_frames = getattr(settings, 'DETECTOR_MAX_UPLOAD_FRAMES', 8)
+        if len(payloads) > max_frames:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Máximo {max_frames} frames por petición'
+            })
             
-        # Agregar resultado de entrenamiento si existe
-        if training_result:
-            response_data['training_result'] = training_result
+        frames = []
+        for index, data in enumerate(payloads):
+            frame = decode_image(data)
+            if frame is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'El frame {index} no es una imagen válida'
+                })
+            frames.append(frame)
             
-        return JsonResponse(response_data)
+        # Un solo predict en lote para todos los frames de la petición
+        results = detector.process_batch(frames, _get_session(request, SOURCE_UPLOAD))
+        
+        return JsonResponse({
+            'status': 'success',
+            'results': [
+                {
+                    'index': index,
+                    'letter': result.letter,
+                    'confidence': result.confidence,
+                    'box': result.box,
+                    'landmarks': result.landmarks,
+                    'engine': result.engine,
+                    'training': result.training,
+                    'training_result': result.training_result,
+                }
+                for index, result in enumerate(results)
+            ]
+        })
         
     except Exception as e:
         return JsonResponse({
-            'letter': 'ERROR',
-            'confidence': 0,
             'status': 'error',
-            'message': str(e)
+            'message': f'Error procesando frames: {str(e)}'
         })
 
 def video_feed(request):
     """Stream de video para la cámara"""
-    def generate():
-        while detector.is_running:
-            frame_data, letter, confidence, training_result = detector.process_frame()
-            if frame_data:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + 
-                       base64.b64decode(frame_data) + b'\r\n')
-            time.sleep(0.033)  # ~30 FPS
+    if not detector_loader.ready:
+        return HttpResponse(status=503)
     
-    return StreamingHttpResponse(generate(), 
+    # Bajo ASGI Django lee un iterador síncrono completo antes de enviar nada:
+    # el MJPEG infinito necesita un generador asíncrono
+    stream = _mjpeg_stream_async() if isinstance(request, ASGIRequest) else _mjpeg_stream()
+    return StreamingHttpResponse(stream, 
                                content_type='multipart/x-mixed-replace; boundary=frame')
 
+def _mjpeg_part(packet, subscription, adaptive):
+    """Cabecera y bytes del frame al nivel de calidad actual del espectador"""
+    quality, scale = subscription.level = adaptive.level if adaptive else (detector.encoder.quality, 1.0)
+    # El MJPEG se ve sin canvas: pedir la variante con el overlay dibujado
+    with detector.metrics.span('stream_encode'):
+        data = packet.get(quality, scale, annotated=True)
+    return f'--frame\r\nContent-Type: {detector.encoder.content_type}\r\n\r\n'.encode(), data
+
+def _mjpeg_stream():
+    # Cada espectador recibe el frame ya codificado; si se atrasa pierde frames
+    subscription = detector.broadcaster.subscribe()
+    adaptive = detector.create_stream_quality()
+    try:
+        while detector.is_running:
+            packet = subscription.get(timeout=1.0)
+            if packet is None:
+                continue
+            header, data = _mjpeg_part(packet, subscription, adaptive)
+            # Se envían las partes por separado para no copiar la imagen
+            yield header
+            started = time.perf_counter()
+            yield data
+            # El servidor retoma el generador cuando terminó de escribir el frame
+            if adaptive is not None:
+                adaptive.update((time.perf_counter() - started) * 1000)
+            yield b'\r\n'
+    finally:
+        detector.broadcaster.unsubscribe(subscription)
+
+async def _mjpeg_stream_async():
+    """Igual que _mjpeg_stream, con la espera y la codificación fuera del event loop"""
+    subscription = detector.broadcaster.subscribe()
+    adaptive = detector.create_stream_quality()
+    # thread_sensitive=False: no ocupar el hilo compartido de las vistas síncronas
+    get_packet = sync_to_async(subscription.get, thread_sensitive=False)
+    encode_part = sync_to_async(_mjpeg_part, thread_sensitive=False)
+    try:
+        while detector.is_running:
+            packet = await get_packet(timeout=1.0)
+            if packet is None:
+                continue
+            header, data = await encode_part(packet, subscription, adaptive)
+            yield header
+            started = time.perf_counter()
+            yield data
+            if adaptive is not None:
+                adaptive.update((time.perf_counter() - started) * 1000)
+            yield b'\r\n'
+    finally:
+        detector.broadcaster.unsubscribe(subscription)
+
+def frame_image(request, frame_id):
+    """JPEG de un frame publicado, tal cual lo codificó el detector"""
+    frame = detector.get_frame(frame_id) if detector_loader.ready else None
+    if frame is None:
+        return HttpResponse(status=404)
+    response = HttpResponse(frame, content_type=detector.encoder.content_type)
+    # Los frame_id vuelven a empezar en cada start_detection: no guardar en caché
+    # (la página pide cada frame una sola vez, así que no se pierde nada)
+    response['Cache-Control'] = 'no-store'
+    return response
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def toggle_detection(request):
@@ -181,9 +316,9 @@ def test_camera(request):
 def test_model(request):
     """Probar si el modelo está cargado correctamente"""
     try:
-        from .detector_service import detector
         model_info = {
-            'model_loaded': hasattr(detector, 'model'),
+            'model_loaded': hasattr(detector, 'backend'),
+            'backend': detector.backend.name,
             'class_names_count': len(detector.class_names),
             'is_running': detector.is_running
         }
@@ -197,16 +332,143 @@ def test_model(request):
             'message': f'Error con el modelo: {str(e)}'
         })
 
+def detector_stats(request):
+    """Métricas del planificador de lotes de inferencia"""
+    if not detector_loader.ready:
+        return JsonResponse({'is_running': False, 'detector': detector_loader.state()})
+    return JsonResponse({
+        'is_running': detector.is_running,
+        'sessions': len(detector.sessions),
+        'landmark_classifier': detector.landmark_classifier is not None,
+        'imgsz': detector.backend.imgsz,
+        'adaptive_imgsz': detector.adaptive_imgsz is not None,
+        'roi_tracking': detector.tracker.stats() if detector.tracker is not None else None,
+        'smoothing_skipped_frames': detector.skipped_frames,
+        'motion_gate': detector.motion_gate.stats() if detector.motion_gate is not None else None,
+        'validation_cache': detector.validation_cache.stats() if detector.validation_cache is not None else None,
+        'video_feed': dict(detector.broadcaster.stats(), encoder=detector.encoder.name),
+        'pipeline': detector.pipeline.stats() if detector.pipeline is not None else None,
+        'batching': detector.batcher.stats()
+    })
+
+def _loader_samples():
+    """Estado de carga del detector como indicadores (1 en el estado actual)"""
+    return [
+        ('state', 'gauge', 'Estado de carga del detector', {'state': status}, int(detector_loader.status == status))
+        for status in (DetectorLoader.IDLE, DetectorLoader.WARMING, DetectorLoader.READY, DetectorLoader.FAILED)
+    ]
+
+def metrics(request):
+    """Duración por etapa y contadores en formato de texto de Prometheus"""
+    if not detector_loader.ready:
+        # Sin cargar todavía: no se fuerza la carga del modelo desde el scraper
+        return HttpResponse(render_prometheus(None, _loader_samples()), content_type=PROMETHEUS_CONTENT_TYPE)
+    return HttpResponse(
+        render_prometheus(detector.metrics, _loader_samples() + detector.metric_samples()),
+        content_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+def metrics_debug(request):
+    """Las mismas métricas en JSON, con percentiles de la ventana reciente por etapa"""
+    if not detector_loader.ready:
+        return JsonResponse({'detector': detector_loader.state(), 'stages': {}, 'counters': {}})
+    counters = {}
+    for name, _, _, labels, value in detector.metric_samples():
+        key = name + ''.join(f'[{label}={label_value}]' for label, label_value in labels.items())
+        counters[key] = value
+    return JsonResponse({
+        'stages': detector.metrics.stage_stats(),
+        'counters': counters,
+    })
+
+def health(request):
+    """Estado del detector para sondas: 'warming', 'ready' o 'failed' (503 si no está listo)"""
+    if detector_loader.status == DetectorLoader.IDLE:
+        # Nadie lo usó todavía (sin DETECTOR_WARMUP): empezar a cargarlo ahora
+        detector_loader.warm_up_in_background()
+    state = detector_loader.state()
+    return JsonResponse(state, status=200 if state['status'] == DetectorLoader.READY else 503)
+
+@staff_member_required
+@require_http_methods(["POST"])
+def profile(request):
+    """Perfilar los hilos del detector N segundos (solo staff) y guardar el flame graph en disco.
+
+    Parámetros POST: seconds, format ('speedscope' o 'collapsed'), allocations ('0' para
+    no usar tracemalloc) y threads (prefijo del nombre de los hilos a muestrear).
+    Con protección CSRF: se llama desde una sesión del admin (token csrftoken).
+    """
+    try:
+        max_seconds = getattr(settings, 'DETECTOR_PROFILE_MAX_SECONDS', 60)
+        seconds = min(max(float(request.POST.get('seconds', 10)), 0.5), max_seconds)
+        output_format = request.POST.get('format', 'speedscope')
+        if output_format not in ('speedscope', 'collapsed'):
+            return JsonResponse({
+                'status': 'error',
+                'message': f"Formato desconocido: {output_format} (opciones: speedscope, collapsed)"
+            })
+        
+        summary = profile_detector(
+            detector, seconds,
+            output_dir=getattr(settings, 'DETECTOR_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles')),
+            output_format=output_format,
+            allocations=request.POST.get('allocations', '1') != '0',
+            interval=getattr(settings, 'DETECTOR_PROFILE_INTERVAL', 0.005),
+            thread_prefix=request.POST.get('threads', 'detector'),
+        )
+        if summary is None:
+            return JsonResponse({'status': 'error', 'message': 'Ya hay un perfilado en curso'})
+        return JsonResponse(dict(summary, status='success'))
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Error perfilando el detector: {str(e)}'
+        })
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def set_engine(request):
+    """Elegir el motor de esta sesión: 'yolo' o 'landmarks' (YOLO queda de respaldo)"""
+    try:
+        engine = json.loads(request.body or b'{}').get('engine')
+        if engine not in ENGINES:
+            return JsonResponse({
+                'status': 'error',
+                'message': f"Motor desconocido: {engine} (opciones: {', '.join(ENGINES)})"
+            })
+        session = _get_session(request)
+        session.engine = engine
+        effective = detector.engine_for(session)
+        data = {
+            'status': 'success',
+            'engine': effective,
+            'message': f'Motor seleccionado: {effective}' if effective == engine else
+                       'No hay clasificador de landmarks entrenado; se usa YOLO'
+        }
+        if session.source == SOURCE_CAMERA:
+            # La cámara del servidor hace un solo análisis para todas sus sesiones
+            data['camera_engine'] = detector.camera_engine()
+            if data['camera_engine'] != effective:
+                data['message'] = (
+                    f"Otra sesión de la cámara usa {data['camera_engine']}: la cámara sigue con "
+                    f"{data['camera_engine']} hasta que todas elijan {effective}"
+                )
+        return JsonResponse(data)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Error cambiando de motor: {str(e)}'
+        })
+
 @csrf_exempt
 def start_training(request):
     """Iniciar modo entrenamiento"""
     try:
-        from .detector_service import detector
-        detector.start_training_mode()
+        target_letter = _get_session(request).start_training_mode()
         return JsonResponse({
             'status': 'success',
-            'target_letter': detector.target_letter,
-            'message': f'Modo entrenamiento iniciado. Haz la letra "{detector.target_letter}"'
+            'target_letter': target_letter,
+            'message': f'Modo entrenamiento iniciado. Haz la letra "{target_letter}"'
         })
     except Exception as e:
         return JsonResponse({
@@ -218,9 +480,9 @@ def start_training(request):
 def stop_training(request):
     """Detener modo entrenamiento"""
     try:
-        from .detector_service import detector
-        stats = detector.get_training_status()
-        detector.stop_training_mode()
+        session = _get_session(request)
+        stats = session.get_training_status()
+        session.stop_training_mode()
         return JsonResponse({
             'status': 'success',
             'final_stats': stats,
@@ -236,24 +498,24 @@ def stop_training(request):
 def get_training_feedback(request):
     """Obtener retroalimentación del entrenamiento"""
     try:
-        from .detector_service import detector
-        if not detector.training_mode:
+        session = _get_session(request)
+        training = session.training
+        if not training.active:
             return JsonResponse({
                 'active': False,
                 'message': 'Modo entrenamiento no activo'
             })
             
-        # Verificar si hay una detección reciente correcta
-        if detector.current_letter and detector.current_confidence >= 70:
-            result = detector.check_training_success(detector.current_letter, detector.current_confidence)
-            if result:
-                return JsonResponse(result)
-                
+        # El bucle de inferencia ya evalúa cada frame; aquí solo se lee el resultado
+        if training.last_result and training.last_result['success']:
+            return JsonResponse(training.last_result)
+            
+        snapshot = session.result
         return JsonResponse({
             'active': True,
-            'target_letter': detector.target_letter,
-            'current_letter': detector.current_letter,
-            'confidence': detector.current_confidence
+            'target_letter': training.target_letter,
+            'current_letter': snapshot.letter,
+            'confidence': snapshot.confidence
         })
         
     except Exception as e:
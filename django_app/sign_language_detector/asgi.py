@@ -0,0 +1,66 @@
+import asyncio
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sign_language_detector.settings')
+
+django_application = get_asgi_application()
+
+# Importar después de configurar Django
+from django.conf import settings  # noqa: E402
+from detector.detector_service import detector_loader  # noqa: E402
+from detector.realtime import DetectionSocket  # noqa: E402
+
+# Cargar el modelo en segundo plano al arrancar el servidor (no en migrate ni collectstatic)
+if getattr(settings, 'DETECTOR_WARMUP', True):
+    detector_loader.warm_up_in_background()
+
+detection_socket = DetectionSocket()
+
+
+async def stream_until_disconnect(scope, receive, send):
+    """Servir un stream infinito y cancelarlo cuando el cliente se desconecta.
+
+    Django 4.2 no escucha http.disconnect mientras envía un StreamingHttpResponse
+    (y uvicorn ignora los send de un cliente que ya se fue): sin esto el MJPEG
+    seguiría codificando frames hasta detener la cámara.
+    """
+    body_read = asyncio.Event()
+
+    async def receive_body():
+        message = await receive()
+        if not message.get('more_body', False):
+            body_read.set()
+        return message
+
+    async def watch_disconnect():
+        await body_read.wait()
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        response.cancel()
+
+    response = asyncio.ensure_future(django_application(scope, receive_body, send))
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await response
+    except asyncio.CancelledError:
+        if not watcher.done():
+            # Cancelado por el servidor, no por la desconexión
+            response.cancel()
+            raise
+    finally:
+        watcher.cancel()
+
+
+async def application(scope, receive, send):
+    """HTTP a Django; WebSocket /ws/detection/ al canal push del detector"""
+    if scope['type'] == 'websocket':
+        if scope['path'] == '/ws/detection/':
+            await detection_socket(scope, receive, send)
+        else:
+            await send({'type': 'websocket.close'})
+        return
+    if scope['type'] == 'http' and scope['path'] == '/video-feed/':
+        await stream_until_disconnect(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -52,6 +52,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'sign_language_detector.wsgi.application'
+# Despliegue ASGI (uvicorn/daphne): agrega el WebSocket /ws/detection/
+ASGI_APPLICATION = 'sign_language_detector.asgi.application'
 
 # Database
 DATABASES = {
@@ -93,4 +95,106 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Rutas de modelos
-MODEL_PATH = os.path.join(BASE_DIR.parent, 'runs/detect/train/weights/best.pt')
+MODEL_PATH = os.path.join(BASE_DIR.parent, 'runs/detect/train3/weights/best.pt')
+
+# Motor de inferencia: 'ultralytics' (PyTorch), 'onnxruntime' u 'openvino'.
+# Los modelos exportados se generan con: python manage.py export_model
+DETECTOR_BACKEND = 'ultralytics'
+DETECTOR_BACKEND_MODEL_PATH = None  # None = ruta por defecto junto a MODEL_PATH
+DETECTOR_NUM_THREADS = None  # None = valor por defecto del motor
+
+# Tamaño de entrada YOLO: None = el de entrenamiento (imgsz: 416 en runs/detect/train3/args.yaml)
+DETECTOR_IMGSZ = None
+# Modo adaptativo: baja/sube imgsz según el tiempo por frame (requiere .pt o exportación --dynamic)
+DETECTOR_ADAPTIVE_IMGSZ = False
+DETECTOR_IMGSZ_CHOICES = (320, 416, 512)
+DETECTOR_FRAME_BUDGET_MS = None  # None = 1000 / DETECTOR_INFERENCE_FPS
+
+# Resolución pedida a la cámara (ancho, alto); menos píxeles = flip, copia y letterbox más baratos
+DETECTOR_CAPTURE_SIZE = (640, 480)
+
+# Detector: frames por segundo del bucle de inferencia en segundo plano
+DETECTOR_INFERENCE_FPS = 15
+
+# Detector: estado por sesión (suavizado y entrenamiento) e instancias de MediaPipe compartidas
+DETECTOR_MAX_SESSIONS = 50
+DETECTOR_SESSION_IDLE_TIMEOUT = 300  # segundos sin peticiones antes de expulsar la sesión
+DETECTOR_HANDS_POOL_SIZE = 2
+
+# Sesiones en cookie firmada: el sondeo de /detection-data/ no toca la base de datos
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+
+# Detector: máximo de frames aceptados por petición en /upload-frames/
+DETECTOR_MAX_UPLOAD_FRAMES = 8
+
+# Detector: micro-lotes de inferencia (espera máxima y tamaño máximo de lote)
+DETECTOR_BATCH_WINDOW_MS = 8
+DETECTOR_MAX_BATCH = 8
+
+# Detector: YOLO sobre un recorte alrededor de la última mano; frame completo cada N frames o al perderla
+DETECTOR_ROI_TRACKING = True
+DETECTOR_ROI_PADDING = 0.5  # margen alrededor de la caja, relativo a su lado mayor
+DETECTOR_ROI_FULL_FRAME_INTERVAL = 10
+
+# Detector: JPEG de los últimos N frames publicados disponibles en /frame/<frame_id>/
+DETECTOR_RECENT_FRAMES = 4
+
+# Detector: segundos máximos sin mensajes en el WebSocket /ws/detection/ (mantiene viva la sesión)
+DETECTOR_PUSH_KEEPALIVE = 25
+
+# Detector: codificación de frames para el navegador
+DETECTOR_ENCODER = 'opencv'  # 'opencv' (JPEG), 'turbojpeg' (pip install PyTurboJPEG + libjpeg-turbo) o 'webp'
+DETECTOR_ENCODE_QUALITY = 85
+DETECTOR_STREAM_MAX_WIDTH = None  # px; None = resolución de captura
+# MJPEG: cada espectador baja a estos niveles (calidad, escala) si tarda más que un intervalo en recibir un frame
+DETECTOR_STREAM_ADAPTIVE = True
+DETECTOR_STREAM_LEVELS = ((70, 0.75), (55, 0.5))
+
+# Detector: True = la página dibuja caja, landmarks y etiqueta en un canvas sobre el video
+# (el servidor solo dibuja para /video-feed/); False = se dibujan en todos los frames del servidor
+DETECTOR_CLIENT_OVERLAY = True
+
+# Detector: reutilizar la validación de MediaPipe si la caja YOLO apenas se movió (IoU),
+# repitiéndola como máximo cada N frames (0 = MediaPipe en todos los frames)
+DETECTOR_VALIDATION_IOU = 0.7
+DETECTOR_VALIDATION_INTERVAL = 5
+
+# Detector: motor por defecto de cada sesión ('yolo' o 'landmarks'; se cambia por sesión en /set-engine/).
+# 'landmarks' clasifica los 21 puntos de MediaPipe con k-NN y usa YOLO solo como respaldo.
+# El clasificador se entrena con: python manage.py train_landmark_classifier
+DETECTOR_ENGINE = 'yolo'
+DETECTOR_LANDMARK_MODEL_PATH = os.path.join(BASE_DIR.parent, 'runs/landmarks/knn.npz')
+DETECTOR_LANDMARK_MIN_CONFIDENCE = 0.6
+
+# Detector: etapas detección -> validación -> codificación en hilos propios con colas acotadas
+# (frames consecutivos se procesan en paralelo); False = todo en secuencia en un solo hilo
+DETECTOR_PIPELINE = True
+DETECTOR_PIPELINE_QUEUE_SIZE = 1
+
+# Detector: suavizado temporal por sesión (votos ponderados por confianza en una ventana de N detecciones)
+DETECTOR_SMOOTHING_WINDOW = 7
+DETECTOR_SMOOTHING_DECAY = 0.9  # peso relativo de cada frame anterior (1.0 = sin decaimiento)
+DETECTOR_SMOOTHING_MIN_HOLD = 0.3  # segundos mínimos antes de cambiar la letra confirmada
+# Saltar YOLO/MediaPipe mientras ninguna sesión pueda cambiar de letra (solo se actualiza la imagen)
+DETECTOR_SMOOTHING_SKIP_INFERENCE = False
+
+# Detector: saltar YOLO/MediaPipe si la escena casi no cambió respecto del último frame procesado
+# (diferencia media en escala de grises 0-255 sobre una miniatura 64x48); se procesa al menos cada N frames
+DETECTOR_MOTION_GATING = True
+DETECTOR_MOTION_THRESHOLD = 4.0
+DETECTOR_MOTION_MAX_SKIP = 15
+
+# Detector: métricas por etapa (captura, flip, YOLO, MediaPipe, dibujo, codificación, serialización)
+# en /metrics (Prometheus) y /metrics/debug/ (JSON); percentiles sobre las últimas N mediciones
+DETECTOR_METRICS_WINDOW = 500
+
+# Detector: perfilado bajo demanda (POST /profile/, solo usuarios staff): flame graph
+# (speedscope o pilas colapsadas) de los hilos del detector + diferencia de tracemalloc
+DETECTOR_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+DETECTOR_PROFILE_MAX_SECONDS = 60
+DETECTOR_PROFILE_INTERVAL = 0.005  # segundos entre muestras
+
+# Detector: el modelo se carga en el primer uso, no al importar las vistas. Con DETECTOR_WARMUP
+# el servidor (wsgi/asgi) lo carga en segundo plano al arrancar con una inferencia de prueba;
+# /health/ responde 'warming', 'ready' o 'failed'
+DETECTOR_WARMUP = True
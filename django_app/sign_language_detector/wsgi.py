@@ -4,3 +4,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sign_language_detector.settings')
 
 application = get_wsgi_application()
+
+# Cargar el modelo en segundo plano al arrancar el servidor (no en migrate ni collectstatic)
+from django.conf import settings  # noqa: E402
+from detector.detector_service import detector_loader  # noqa: E402
+
+if getattr(settings, 'DETECTOR_WARMUP', True):
+    detector_loader.warm_up_in_background()